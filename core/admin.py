@@ -1,5 +1,6 @@
 # core/admin.py
 from django.contrib import admin
+from django.utils import timezone
 from django.utils.html import format_html
 
 from .models import (
@@ -12,6 +13,8 @@ from .models import (
     ProductImage,
     Order,
     OrderItem,
+    Job,
+    OrderNotification,
 )
 
 
@@ -111,7 +114,7 @@ class DocumentAdmin(admin.ModelAdmin):
 
 @admin.register(MerchCategory)
 class MerchCategoryAdmin(admin.ModelAdmin):
-    list_display = ("name", "slug", "id")
+    list_display = ("name", "slug", "products_count", "in_stock_count", "id")
     search_fields = ("name", "slug")
     prepopulated_fields = {"slug": ("name",)}  # удобно в админке
 
@@ -149,6 +152,8 @@ class ProductAdmin(admin.ModelAdmin):
         "created_at",
         "updated_at",
     )
+    # category nullable -> админка сама select_related не сделает, будет запрос на каждую строку
+    list_select_related = ("category",)
     list_filter = ("in_stock", "category")
     search_fields = ("name", "description", "comment", "size")
     readonly_fields = ("uuid", "created_at", "updated_at")
@@ -221,4 +226,46 @@ class OrderItemAdmin(admin.ModelAdmin):
     list_display = ("order", "name_at_order", "quantity", "price_at_order", "selected_size", "selected_color")
     search_fields = ("order__order_number", "name_at_order")
     list_filter = ("selected_size", "selected_color")
-    autocomplete_fields = ("order", "product")
\ No newline at end of file
+    autocomplete_fields = ("order", "product")
+
+# -------------------------
+# Background jobs
+# -------------------------
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "status", "priority", "attempts", "run_at", "locked_by", "finished_at")
+    list_filter = ("status", "name")
+    search_fields = ("name", "last_error")
+    readonly_fields = ("locked_by", "locked_at", "last_error", "created_at", "finished_at")
+    actions = ("retry_now",)
+
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status=Job.STATUS_RUNNING).update(
+            status=Job.STATUS_QUEUED, run_at=timezone.now(), attempts=0, locked_by="", locked_at=None
+        )
+        self.message_user(request, f"Поставлено в очередь: {updated} задач(и).")
+
+    retry_now.short_description = "Перезапустить сейчас"
+
+
+@admin.register(OrderNotification)
+class OrderNotificationAdmin(admin.ModelAdmin):
+    list_display = ("order", "sink", "status", "attempts", "next_attempt_at", "sent_at")
+    list_filter = ("status", "sink")
+    search_fields = ("order__order_number", "last_error")
+    readonly_fields = ("order", "sink", "payload", "attempts", "locked_at", "last_error", "created_at", "sent_at")
+    actions = ("resend",)
+
+    def resend(self, request, queryset):
+        from .notifications import DISPATCH_TASK
+        from .jobs import enqueue
+
+        updated = queryset.exclude(status=OrderNotification.STATUS_SENDING).update(
+            status=OrderNotification.STATUS_PENDING, next_attempt_at=timezone.now(), attempts=0
+        )
+        if updated:
+            enqueue(DISPATCH_TASK, priority=10)
+        self.message_user(request, f"Поставлено на повторную отправку: {updated}.")
+
+    resend.short_description = "Отправить повторно"
@@ -6,6 +6,11 @@ class CoreConfig(AppConfig):
     name = 'core'
 
     def ready(self):
+        from . import db  # noqa
+        from . import nplusone  # noqa
+        from . import perf  # noqa
+        from . import routers  # noqa
         from . import signals  # noqa
+        from . import tasks  # noqa
 
 
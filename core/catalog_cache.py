@@ -0,0 +1,108 @@
+# core/catalog_cache.py
+"""
+Серверный кэш ответов публичного каталога (API v1 merch).
+
+Ключ = нормализованные параметры запроса + хост + версия каталога.
+Версия и время последнего изменения — одна строка CatalogVersion в БД, общая для всех
+процессов: сигналы Product / ProductImage / MerchCategory (в т.ч. удаления) увеличивают её
+в той же транзакции, что и правку, поэтому после коммита все воркеры перестают читать
+старые ключи, а ETag и Last-Modified у всех воркеров одинаковые и не идут назад.
+Сами ответы лежат в MERCH_CACHE_ALIAS (может быть и per-process: ключи версионные).
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+from django.utils import timezone
+
+from . import perf
+
+
+def _cache():
+    return caches[getattr(settings, "MERCH_CACHE_ALIAS", "default")]
+
+
+def _timeout() -> int:
+    return int(getattr(settings, "MERCH_CACHE_TIMEOUT", 300))
+
+
+def load_catalog_state() -> tuple[int, int]:
+    """(версия, unix-время последнего изменения) — один запрос по PK."""
+    from .models import CatalogVersion
+
+    row = CatalogVersion.objects.filter(pk=1).values_list("version", "changed_at").first()
+    if row is None:
+        # строку создаёт миграция; сюда попадаем только после flush (TransactionTestCase)
+        obj, _ = CatalogVersion.objects.get_or_create(pk=1, defaults={"version": time.time_ns()})
+        row = (obj.version, obj.changed_at)
+    version, changed_at = row
+    return int(version), int(changed_at.timestamp())
+
+
+def _state(request) -> tuple[int, int]:
+    # ключ кэша и Last-Modified одного запроса берём из одного чтения версии
+    state = getattr(request, "_catalog_state", None)
+    if state is None:
+        state = request._catalog_state = load_catalog_state()
+    return state
+
+
+def get_last_modified(request) -> int:
+    """Время последнего изменения каталога (unix timestamp) для Last-Modified."""
+    return _state(request)[1]
+
+
+def bump_catalog_version(using: str = "default") -> None:
+    from .models import CatalogVersion
+
+    updated = CatalogVersion.objects.using(using).filter(pk=1).update(
+        version=F("version") + 1, changed_at=timezone.now()
+    )
+    if not updated:
+        CatalogVersion.objects.using(using).get_or_create(pk=1, defaults={"version": time.time_ns()})
+
+
+def cache_key(kind: str, request, **params) -> str:
+    normalized = json.dumps(
+        {"host": request.build_absolute_uri("/"), **params},
+        sort_keys=True,
+        default=str,
+        ensure_ascii=False,
+    )
+    digest = hashlib.sha1(normalized.encode()).hexdigest()
+    return f"merch:v{_state(request)[0]}:{kind}:{digest}"
+
+
+def etag_for(key: str) -> str:
+    # key уже содержит версию каталога и все параметры ответа -> сильный ETag
+    return '"%s"' % hashlib.sha1(key.encode()).hexdigest()
+
+
+def get_or_build(key: str, build):
+    cache = _cache()
+    data = cache.get(key)
+    if data is None:
+        perf.count("cache_miss")
+        data = build()
+        cache.set(key, data, timeout=_timeout())
+    else:
+        perf.count("cache_hit")
+    return data
+
+
+async def aget_or_build(key: str, abuild):
+    """Async-вариант get_or_build: abuild — корутинная функция."""
+    cache = _cache()
+    data = await cache.aget(key)
+    if data is None:
+        perf.count("cache_miss")
+        data = await abuild()
+        await cache.aset(key, data, timeout=_timeout())
+    else:
+        perf.count("cache_hit")
+    return data
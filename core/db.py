@@ -0,0 +1,48 @@
+# core/db.py
+"""
+Настройка SQLite-соединений для продакшена.
+
+На каждое новое соединение (сигнал connection_created) применяем PRAGMA из
+settings.SQLITE_PRAGMAS: WAL (читатели не блокируют писателя), synchronous=NORMAL,
+busy_timeout (ждать блокировку вместо «database is locked»), mmap/cache, temp_store.
+Транзакции на запись открываются как BEGIN IMMEDIATE через
+DATABASES[...]["OPTIONS"]["transaction_mode"] (см. settings).
+"""
+from __future__ import annotations
+
+import re
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+ALLOWED_PRAGMAS = {
+    "journal_mode",
+    "synchronous",
+    "busy_timeout",
+    "mmap_size",
+    "cache_size",
+    "temp_store",
+    "foreign_keys",
+    "wal_autocheckpoint",
+}
+_VALUE_RE = re.compile(r"^-?[A-Za-z0-9_]+$")
+
+
+def apply_sqlite_pragmas(cursor, pragmas: dict) -> None:
+    """Применяет PRAGMA к DB-API курсору (используется и в bench_sqlite)."""
+    for name, value in pragmas.items():
+        value = str(value)
+        if name not in ALLOWED_PRAGMAS or not _VALUE_RE.match(value):
+            raise ValueError(f"Недопустимая PRAGMA: {name}={value!r}")
+        cursor.execute(f"PRAGMA {name} = {value}")
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    if connection.vendor != "sqlite":
+        return
+    pragmas = getattr(settings, "SQLITE_PRAGMAS", None)
+    if pragmas:
+        with connection.cursor() as cursor:
+            apply_sqlite_pragmas(cursor, pragmas)
@@ -0,0 +1,259 @@
+# core/downloads.py
+"""
+Отдача файлов документов (DocumentViewSet.download) после проверки доступа.
+
+serve() отвечает 304/412 по If-None-Match / If-Match (ETag — sha256 содержимого из
+Document.content_hash), остальное делает бэкенд.
+
+FileResponseBackend гонит файл через Python — воркер занят всё время передачи.
+Он же поддерживает Range (один диапазон — 206, несколько — multipart/byteranges), If-Range
+и HEAD без открытия файла (размер берётся из Document.file_size).
+XAccelRedirectBackend (nginx) и XSendfileBackend (Apache mod_xsendfile, lighttpd) отвечают
+пустым телом с заголовком, и файл отдаёт веб-сервер, а воркер сразу свободен;
+Range и HEAD тогда тоже обрабатывает веб-сервер.
+Если заголовком файл не выразить (хранилище без локального пути и т.п.) — FileResponse.
+
+settings.DOCUMENT_DOWNLOAD:
+
+    DOCUMENT_DOWNLOAD = {
+        "BACKEND": "core.downloads.XAccelRedirectBackend",
+        "OPTIONS": {"location": "/protected-media/"},
+    }
+
+nginx:
+
+    location /protected-media/ {
+        internal;
+        alias /srv/school/media/;
+    }
+"""
+from __future__ import annotations
+
+import json
+import logging
+import mimetypes
+import re
+import secrets
+from dataclasses import dataclass
+from functools import lru_cache
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger("core.downloads")
+
+# больше диапазонов в одном Range — отдаём файл целиком (RFC 9110 это разрешает)
+MAX_RANGES = 16
+CHUNK_SIZE = 64 * 1024
+
+_RANGE_SPEC_RE = re.compile(r"^(\d*)-(\d*)$", re.ASCII)
+
+
+@dataclass
+class Download:
+    file: object  # FieldFile
+    filename: str
+    size: int | None = None  # None — спросим у хранилища (stat, без открытия)
+    etag: str | None = None  # сильный, в кавычках
+
+    @property
+    def content_type(self) -> str:
+        content_type, _ = mimetypes.guess_type(self.filename)
+        return content_type or "application/octet-stream"
+
+    def get_size(self) -> int:
+        if self.size is None:
+            self.size = self.file.size
+        return self.size
+
+
+def parse_range_header(header: str, size: int) -> list[tuple[int, int]] | None:
+    """
+    "bytes=0-99,200-,-50" -> [(0, 99), (200, size-1), (size-50, size-1)], концы включительно.
+    None — заголовок не разобрать (игнорируем, отдаём весь файл); [] — ни один диапазон
+    не попал в файл (416).
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec.strip():
+        return None
+    ranges = []
+    for part in spec.split(","):
+        match = _RANGE_SPEC_RE.match(part.strip())
+        if not match or match.group(1) == match.group(2) == "":
+            return None
+        start, end = match.groups()
+        if not start:  # суффикс: последние N байт
+            if int(end) > 0 and size > 0:
+                ranges.append((max(0, size - int(end)), size - 1))
+        elif end and int(end) < int(start):
+            return None
+        elif int(start) < size:
+            ranges.append((int(start), min(int(end), size - 1) if end else size - 1))
+    return ranges if len(ranges) <= MAX_RANGES else None
+
+
+def _requested_ranges(request, download: Download) -> list[tuple[int, int]] | None:
+    header = request.headers.get("Range")
+    if not header or request.method not in ("GET", "HEAD"):
+        return None
+    if_range = request.headers.get("If-Range")
+    # If-Range с датой не поддерживаем (Last-Modified не отдаём), со слабым/чужим ETag — весь файл
+    if if_range is not None and (download.etag is None or if_range.strip() != download.etag):
+        return None
+    return parse_range_header(header, download.get_size())
+
+
+def _read_ranges(file, ranges: list[tuple[int, int]], framing: list[tuple[bytes, bytes]] | None = None):
+    """Содержимое диапазонов; framing — заголовок/хвост части multipart вокруг каждого."""
+    with file.open("rb") as f:
+        for i, (start, end) in enumerate(ranges):
+            if framing:
+                yield framing[i][0]
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+            if framing:
+                yield framing[i][1]
+
+
+class BaseDownloadBackend:
+    def __init__(self, **options):
+        self.options = options
+
+    def response(self, request, download: Download) -> HttpResponse:
+        raise NotImplementedError
+
+
+class FileResponseBackend(BaseDownloadBackend):
+    """Файл отдаёт сам Django (runserver, запасной вариант); Range, If-Range, HEAD."""
+
+    def response(self, request, download: Download) -> HttpResponse:
+        size = download.get_size()
+        ranges = _requested_ranges(request, download)
+
+        if ranges == []:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+        elif ranges is None:
+            if request.method == "HEAD":
+                response = self._head(size, download.content_type)
+            else:
+                response = FileResponse(download.file.open("rb"), as_attachment=True, filename=download.filename)
+        elif len(ranges) == 1:
+            (start, end), = ranges
+            response = self._partial(request, download, ranges, None, end - start + 1, download.content_type)
+            response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        else:
+            boundary = secrets.token_hex(16)
+            framing = [
+                (
+                    f"--{boundary}\r\nContent-Type: {download.content_type}\r\n"
+                    f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n".encode(),
+                    b"\r\n",
+                )
+                for start, end in ranges
+            ]
+            framing[-1] = (framing[-1][0], f"\r\n--{boundary}--\r\n".encode())
+            length = sum(len(head) + len(tail) + end - start + 1 for (head, tail), (start, end) in zip(framing, ranges))
+            response = self._partial(
+                request, download, ranges, framing, length, f"multipart/byteranges; boundary={boundary}"
+            )
+
+        response["Accept-Ranges"] = "bytes"
+        response["Content-Disposition"] = content_disposition_header(True, download.filename)
+        return response
+
+    def _head(self, length: int, content_type: str, status: int = 200) -> HttpResponse:
+        # файл не открываем: Content-Length из Document.file_size
+        response = HttpResponse(status=status, content_type=content_type)
+        response["Content-Length"] = str(length)
+        return response
+
+    def _partial(self, request, download, ranges, framing, length: int, content_type: str) -> HttpResponse:
+        if request.method == "HEAD":
+            return self._head(length, content_type, status=206)
+        response = StreamingHttpResponse(
+            _read_ranges(download.file, ranges, framing), status=206, content_type=content_type
+        )
+        response["Content-Length"] = str(length)
+        return response
+
+
+class HeaderDownloadBackend(BaseDownloadBackend):
+    header = ""
+
+    def target(self, file) -> str | None:
+        """Значение заголовка для веб-сервера; None — отдать через FileResponse."""
+        raise NotImplementedError
+
+    def response(self, request, download: Download) -> HttpResponse:
+        target = self.target(download.file)
+        if target is None:
+            return FileResponseBackend().response(request, download)
+        response = HttpResponse(content_type=download.content_type)
+        response[self.header] = target
+        response["Content-Disposition"] = content_disposition_header(True, download.filename)
+        return response
+
+
+class XAccelRedirectBackend(HeaderDownloadBackend):
+    """nginx: internal location с alias на MEDIA_ROOT. OPTIONS: location."""
+    header = "X-Accel-Redirect"
+
+    def target(self, file) -> str | None:
+        location = self.options.get("location", "/protected-media/").rstrip("/")
+        return f"{location}/{quote(file.name)}"
+
+
+class XSendfileBackend(HeaderDownloadBackend):
+    """
+    Apache mod_xsendfile / lighttpd: абсолютный путь к файлу, percent-encoded —
+    кириллица в заголовке недопустима, а оба сервера путь раскодируют (у mod_xsendfile —
+    XSendFileUnescape On, по умолчанию с 1.0). OPTIONS: unescape=False — сервер путь
+    не раскодирует: не-ASCII пути тогда отдаёт FileResponse (с warning в лог).
+    """
+    header = "X-Sendfile"
+
+    def target(self, file) -> str | None:
+        try:
+            path = file.path
+        except NotImplementedError:  # хранилище без локальных файлов
+            return None
+        if self.options.get("unescape", True):
+            return quote(path)
+        if not path.isascii():
+            logger.warning("X-Sendfile: не-ASCII путь %s без unescape отдаётся через FileResponse", path)
+            return None
+        return path
+
+
+@lru_cache(maxsize=None)
+def _backend_from_settings(config: str) -> BaseDownloadBackend:
+    entry = json.loads(config)
+    return import_string(entry["BACKEND"])(**entry.get("OPTIONS", {}))
+
+
+def get_backend() -> BaseDownloadBackend:
+    config = getattr(settings, "DOCUMENT_DOWNLOAD", {"BACKEND": "core.downloads.FileResponseBackend"})
+    return _backend_from_settings(json.dumps(config, sort_keys=True))
+
+
+def serve(request, download: Download) -> HttpResponse:
+    """Ответ на скачивание: 304/412 по ETag, иначе — настроенный бэкенд."""
+    response = None
+    if download.etag:
+        response = get_conditional_response(request, etag=download.etag)
+    if response is None:
+        response = get_backend().response(request, download)
+    if download.etag:
+        response["ETag"] = download.etag
+    return response
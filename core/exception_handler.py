@@ -7,6 +7,7 @@ from rest_framework.exceptions import APIException, ValidationError, NotFound
 from rest_framework.response import Response
 from rest_framework.views import exception_handler as drf_exception_handler
 
+from . import metrics
 from .exceptions import ApiError
 
 
@@ -32,6 +33,12 @@ def _first_validation_detail(exc: ValidationError) -> dict:
 
 
 def custom_exception_handler(exc, context):
+    resp = _error_response(exc, context)
+    metrics.inc("api_errors_total", code=resp.data["error"]["code"], status=resp.status_code)
+    return resp
+
+
+def _error_response(exc, context):
     # 1) Наши доменные ошибки (по ТЗ)
     if isinstance(exc, ApiError):
         return Response({"success": False, "error": exc.to_payload()}, status=exc.status_code)
@@ -0,0 +1,74 @@
+# core/facets.py
+"""
+Материализованные счётчики товаров по категориям (MerchCategory.products_count / in_stock_count).
+
+Обновляются сигналами Product в той же транзакции, что и сам товар,
+пересобираются командой `python manage.py rebuild_category_counts`.
+"""
+from __future__ import annotations
+
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import Greatest
+
+from .models import MerchCategory, Product
+
+# (category_id, in_stock) или None, если товара нет
+FacetState = tuple | None
+
+
+def product_facet_state(product_id, using: str = "default") -> FacetState:
+    row = (
+        Product.objects.using(using)
+        .filter(pk=product_id)
+        .values_list("category_id", "in_stock")
+        .first()
+    )
+    return tuple(row) if row else None
+
+
+def apply_facet_change(old: FacetState, new: FacetState, using: str = "default") -> None:
+    if old == new:
+        return
+
+    total: Counter = Counter()
+    in_stock: Counter = Counter()
+    for state, sign in ((old, -1), (new, 1)):
+        if state is None or state[0] is None:
+            continue
+        category_id, stock = state
+        total[category_id] += sign
+        if stock:
+            in_stock[category_id] += sign
+
+    for category_id in set(total) | set(in_stock):
+        delta_total, delta_stock = total[category_id], in_stock[category_id]
+        if not delta_total and not delta_stock:
+            continue
+        # счётчики могут разойтись с данными (update() мимо сигналов до rebuild_category_counts);
+        # не даём им уйти ниже нуля — иначе CHECK >= 0 уронит сохранение/удаление самого товара
+        MerchCategory.objects.using(using).filter(pk=category_id).update(
+            products_count=Greatest(F("products_count") + delta_total, 0),
+            in_stock_count=Greatest(F("in_stock_count") + delta_stock, 0),
+        )
+
+
+def rebuild_category_counts(using: str = "default") -> int:
+    with transaction.atomic(using=using):
+        counts = {
+            row["category_id"]: row
+            for row in Product.objects.using(using)
+            .exclude(category__isnull=True)
+            .values("category_id")
+            .annotate(total=Count("id"), in_stock=Count("id", filter=Q(in_stock=True)))
+            .order_by()
+        }
+        categories = list(MerchCategory.objects.using(using).all())
+        for category in categories:
+            row = counts.get(category.pk, {})
+            category.products_count = row.get("total", 0)
+            category.in_stock_count = row.get("in_stock", 0)
+        MerchCategory.objects.using(using).bulk_update(categories, ["products_count", "in_stock_count"])
+    return len(categories)
@@ -0,0 +1,73 @@
+# core/fragments.py
+"""
+Предрассчитанные JSON-фрагменты товаров для публичного каталога (API v1).
+
+Product.api_fragment хранит готовый JSON MerchItemSerializer без привязки к хосту:
+ссылки на фото записаны как FRAGMENT_HOST + "/media/...", а хост подставляется
+при сборке ответа. Списки и карточка товара собираются склейкой строк.
+"""
+from __future__ import annotations
+
+import json
+
+from django.db.models import Prefetch
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import Product, ProductImage
+from .serializers import MerchItemSerializer
+
+# NUL не встречается в нормальных данных; в JSON он кодируется как \u0000
+FRAGMENT_HOST = "\x00host\x00"
+_FRAGMENT_HOST_JSON = json.dumps(FRAGMENT_HOST)[1:-1]
+
+
+def merch_images_prefetch() -> Prefetch:
+    # порядок фото задаём в самом Prefetch, чтобы сериализатор не делал order_by на каждый товар
+    return Prefetch("images", queryset=ProductImage.objects.order_by("order", "id"))
+
+
+def dumps(data) -> str:
+    # тот же формат, что у DRF JSONRenderer (compact, utf-8)
+    return json.dumps(data, cls=JSONEncoder, ensure_ascii=False, separators=(",", ":"))
+
+
+def render_fragment(product: Product) -> str:
+    return dumps(MerchItemSerializer(product, context={"url_prefix": FRAGMENT_HOST}).data)
+
+
+def render_fragments(product_ids, using: str | None = None) -> dict[int, str]:
+    """pk -> свежий фрагмент; без записи в БД. using=None — алиас выбирает роутер."""
+    products = (
+        Product.objects.using(using)
+        .select_related("category")
+        .prefetch_related(merch_images_prefetch())
+        .filter(pk__in=list(product_ids))
+    )
+    return {product.pk: render_fragment(product) for product in products}
+
+
+def refresh_fragments(product_ids, using: str = "default") -> int:
+    fragments = render_fragments(product_ids, using=using)
+    for pk, fragment in fragments.items():
+        Product.objects.using(using).filter(pk=pk).update(api_fragment=fragment)
+    return len(fragments)
+
+
+def fragments_for(products: list[Product]) -> list[str]:
+    """
+    Фрагменты в порядке products. Отсутствующие (товары до миграции 0016 или правки мимо
+    сигналов) рендерятся в памяти: GET ничего не пишет и не перечитывает — с реплики
+    свежезаписанный фрагмент ещё не виден. Сохраняет их rebuild_catalog_fragments.
+    """
+    missing = [p.pk for p in products if not p.api_fragment]
+    if missing:
+        rendered = render_fragments(missing)
+        for p in products:
+            if p.pk in rendered:
+                p.api_fragment = rendered[p.pk]
+    return [p.api_fragment for p in products]
+
+
+def with_host(text: str, request) -> str:
+    host = request.build_absolute_uri("/").rstrip("/")
+    return text.replace(_FRAGMENT_HOST_JSON, json.dumps(host)[1:-1])
@@ -0,0 +1,97 @@
+# core/idempotency.py
+"""
+Идемпотентность POST /api/v1/orders.
+
+Ключ берётся из заголовка Idempotency-Key; без заголовка — из хэша тела запроса и клиента
+(пользователь или IP, как у троттлинга): короткое окно, чтобы поймать двойное нажатие
+«Отправить», но не отдать одинаковый заказ другого родителя. Успешный ответ
+сохраняется в IdempotencyKey и при повторе отдаётся из таблицы без создания заказа.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.throttling import BaseThrottle
+
+from .exceptions import ApiError
+from .models import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+
+
+def request_hash(data) -> str:
+    canonical = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def resolve_key(request, scope: str) -> tuple[str, str, timedelta]:
+    """(ключ, хэш тела, TTL) для запроса."""
+    body_hash = request_hash(request.data)
+    header = (request.headers.get(HEADER) or "").strip()
+
+    if header:
+        if len(header) > MAX_KEY_LENGTH:
+            raise ApiError(
+                code="VALIDATION_ERROR",
+                message="Ошибка валидации данных",
+                status_code=400,
+                details={"field": HEADER, "message": f"Не длиннее {MAX_KEY_LENGTH} символов"},
+            )
+        ttl = getattr(settings, "ORDER_IDEMPOTENCY_TTL", 24 * 3600)
+        return f"{scope}:key:{header}", body_hash, timedelta(seconds=ttl)
+
+    ttl = getattr(settings, "ORDER_IDEMPOTENCY_BODY_TTL", 120)
+    client_hash = request_hash({"client": _client(request), "body": request.data})
+    return f"{scope}:body:{client_hash}", body_hash, timedelta(seconds=ttl)
+
+
+def _client(request) -> str:
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    return f"ip:{BaseThrottle().get_ident(request)}"
+
+
+def find(key: str, body_hash: str) -> IdempotencyKey | None:
+    record = IdempotencyKey.objects.filter(key=key).first()
+    if record is None:
+        return None
+    if record.expires_at <= timezone.now():
+        record.delete()
+        return None
+    if record.request_hash != body_hash:
+        raise ApiError(
+            code="IDEMPOTENCY_KEY_REUSED",
+            message="Ключ идемпотентности уже использован с другими данными",
+            status_code=422,
+            details={"field": HEADER, "message": "Ключ идемпотентности уже использован с другими данными"},
+        )
+    return record
+
+
+def store(key: str, body_hash: str, ttl: timedelta, status_code: int, data: dict, order=None) -> IdempotencyKey:
+    return IdempotencyKey.objects.create(
+        key=key,
+        request_hash=body_hash,
+        response_status=status_code,
+        response_data=data,
+        order=order,
+        expires_at=timezone.now() + ttl,
+    )
+
+
+def cleanup_expired(batch_size: int = 1000) -> int:
+    deleted = 0
+    while True:
+        ids = list(
+            IdempotencyKey.objects.filter(expires_at__lte=timezone.now())
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        deleted += IdempotencyKey.objects.filter(pk__in=ids).delete()[0]
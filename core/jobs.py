@@ -0,0 +1,185 @@
+# core/jobs.py
+"""
+Простая очередь фоновых задач поверх БД (без Redis/брокера).
+
+- enqueue(name, payload) пишет строку Job — в транзакции вызывающего кода,
+  так что задача появляется только вместе с закоммиченными данными;
+- воркер (`python manage.py run_worker`) забирает задачи через UPDATE ... WHERE status='queued'
+  (кто обновил строку — тот и владелец), выполняет в пуле потоков/процессов;
+- при ошибке задача возвращается в очередь с экспоненциальной задержкой,
+  после max_attempts — status=failed;
+- задачу, «running» дольше STALE_LOCK_SECONDS, забирает другой воркер (прежний, видимо, упал);
+  если он всё же жив, его результат не записывается — итог пишет только текущий владелец
+  (locked_by + locked_at). Задачи дольше STALE_LOCK_SECONDS выполнятся повторно — их
+  делаем идемпотентными или дробим;
+- завершённые задачи чистит `python manage.py cleanup_jobs` (cleanup_finished).
+"""
+from __future__ import annotations
+
+import logging
+import traceback
+from datetime import timedelta
+from typing import Any, Callable
+
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger("core.jobs")
+
+BACKOFF_BASE_SECONDS = 10
+BACKOFF_MAX_SECONDS = 3600
+# задача «running» дольше этого считается брошенной (воркер упал) и снова доступна
+STALE_LOCK_SECONDS = 600
+
+_registry: dict[str, Callable[[dict], Any]] = {}
+
+
+def task(name: str):
+    """Регистрирует функцию как фоновую задачу: @task("core.something")."""
+    def decorator(func):
+        _registry[name] = func
+        return func
+    return decorator
+
+
+def get_task(name: str) -> Callable[[dict], Any]:
+    try:
+        return _registry[name]
+    except KeyError:
+        raise LookupError(f"Неизвестная фоновая задача: {name}") from None
+
+
+def enqueue(name: str, payload: dict | None = None, *, priority: int = 0,
+            delay: float = 0, max_attempts: int = 5) -> Job:
+    get_task(name)  # опечатку в имени ловим сразу, а не в воркере
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        priority=priority,
+        max_attempts=max_attempts,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def backoff_seconds(attempts: int) -> int:
+    return min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** max(0, attempts - 1))
+
+
+def claim(worker_id: str, limit: int = 1) -> list[int]:
+    """Забирает до limit готовых задач (по приоритету, затем по run_at). Возвращает их id."""
+    now = timezone.now()
+    stale = now - timedelta(seconds=STALE_LOCK_SECONDS)
+    # брошенная задача, исчерпавшая попытки, не перезапускается, а падает
+    Job.objects.filter(
+        status=Job.STATUS_RUNNING, locked_at__lt=stale, attempts__gte=F("max_attempts")
+    ).update(
+        status=Job.STATUS_FAILED,
+        finished_at=now,
+        last_error=f"Воркер не завершил задачу за {STALE_LOCK_SECONDS} с, попытки исчерпаны",
+        locked_by="",
+    )
+    available = Q(status=Job.STATUS_QUEUED, run_at__lte=now) | Q(
+        status=Job.STATUS_RUNNING, locked_at__lt=stale, attempts__lt=F("max_attempts")
+    )
+
+    candidates = list(
+        Job.objects.filter(available)
+        .order_by("-priority", "run_at", "id")
+        .values_list("pk", "status", "locked_at")[: limit * 2]
+    )
+
+    claimed: list[int] = []
+    for pk, status, locked_at in candidates:
+        if len(claimed) >= limit:
+            break
+        # условие повторяем в UPDATE: если другой воркер успел раньше, обновится 0 строк
+        updated = Job.objects.filter(pk=pk, status=status, locked_at=locked_at).update(
+            status=Job.STATUS_RUNNING,
+            locked_by=worker_id,
+            locked_at=now,
+            attempts=F("attempts") + 1,
+        )
+        if updated:
+            claimed.append(pk)
+    return claimed
+
+
+def _owned(job: Job):
+    # итог пишем, только если задачу за это время не забрал другой воркер
+    return Job.objects.filter(
+        pk=job.pk, status=Job.STATUS_RUNNING, locked_by=job.locked_by, locked_at=job.locked_at
+    )
+
+
+def run_job(job_id: int, worker_id: str) -> str:
+    """
+    Выполняет задачу, захваченную worker_id, и записывает результат. Возвращает итоговый
+    статус; STATUS_RUNNING — задачу перехватил другой воркер, результат не записан.
+    """
+    job = Job.objects.get(pk=job_id)
+    if job.status != Job.STATUS_RUNNING or job.locked_by != worker_id:
+        logger.warning("Job %s #%s is no longer owned by %s, skipped", job.name, job.pk, worker_id)
+        return Job.STATUS_RUNNING
+    try:
+        get_task(job.name)(job.payload)
+    except Exception as exc:
+        return _fail(job, exc)
+
+    if not _owned(job).update(status=Job.STATUS_DONE, finished_at=timezone.now(), last_error="", locked_by=""):
+        logger.warning("Job %s #%s finished by %s after its lock was taken over", job.name, job.pk, worker_id)
+        return Job.STATUS_RUNNING
+    return Job.STATUS_DONE
+
+
+def _fail(job: Job, exc: Exception) -> str:
+    error = "".join(traceback.format_exception(exc))[-5000:]
+    if job.attempts >= job.max_attempts:
+        logger.error("Job %s #%s failed permanently: %s", job.name, job.pk, exc)
+        if not _owned(job).update(
+            status=Job.STATUS_FAILED, finished_at=timezone.now(), last_error=error, locked_by=""
+        ):
+            return Job.STATUS_RUNNING
+        return Job.STATUS_FAILED
+
+    delay = backoff_seconds(job.attempts)
+    logger.warning("Job %s #%s failed (attempt %s), retry in %ss: %s", job.name, job.pk, job.attempts, delay, exc)
+    updated = _owned(job).update(
+        status=Job.STATUS_QUEUED,
+        run_at=timezone.now() + timedelta(seconds=delay),
+        last_error=error,
+        locked_by="",
+        locked_at=None,
+    )
+    return Job.STATUS_QUEUED if updated else Job.STATUS_RUNNING
+
+
+def run_pending(worker_id: str = "inline", limit: int = 100) -> int:
+    """Синхронно выполняет готовые задачи (для тестов и cron). Возвращает число выполненных."""
+    done = 0
+    while done < limit:
+        ids = claim(worker_id, limit=1)
+        if not ids:
+            break
+        run_job(ids[0], worker_id)
+        done += 1
+    return done
+
+
+def cleanup_finished(older_than: timedelta, failed_older_than: timedelta | None = None, batch_size: int = 1000) -> int:
+    """
+    Удаляет done-задачи, завершённые раньше older_than назад, и failed — раньше failed_older_than
+    (по умолчанию тот же срок; failed обычно держат дольше — по last_error разбирают сбои).
+    Пачками, чтобы не держать долгую блокировку записи. Возвращает число удалённых.
+    """
+    now = timezone.now()
+    finished = Q(status=Job.STATUS_DONE, finished_at__lte=now - older_than) | Q(
+        status=Job.STATUS_FAILED, finished_at__lte=now - (failed_older_than or older_than)
+    )
+    deleted = 0
+    while True:
+        ids = list(Job.objects.filter(finished).values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        deleted += Job.objects.filter(pk__in=ids).delete()[0]
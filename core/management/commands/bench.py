@@ -0,0 +1,388 @@
+import json
+import logging
+import random
+import tempfile
+import time
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+
+from core.models import (
+    Document,
+    MerchCategory,
+    Order,
+    OrderItem,
+    Product,
+    ProductImage,
+    Review,
+    SchoolInfo,
+    Teacher,
+)
+
+BATCH = 2000
+METRICS_TOKEN = "bench"
+
+WORDS = (
+    "футболка худи кружка рюкзак блокнот ручка значок шарф кепка пенал "
+    "школьная форма спорт синий белый красный логотип хлопок"
+).split()
+
+
+class Command(BaseCommand):
+    help = (
+        "Бенчмарк публичного API на синтетических данных: создаёт временную БД, "
+        "наполняет её, гоняет каждый маршрут core/urls.py через тестовый клиент и печатает JSON "
+        "(p50/p95/p99, SQL-запросов на запрос, запросов в секунду). "
+        "С --baseline сравнивает с сохранёнными результатами и падает при регрессии."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=10_000)
+        parser.add_argument("--images", type=int, default=2, help="Фото на товар.")
+        parser.add_argument("--categories", type=int, default=200)
+        parser.add_argument("--orders", type=int, default=500_000)
+        parser.add_argument("--reviews", type=int, default=100_000)
+        parser.add_argument("--documents", type=int, default=5_000)
+        parser.add_argument("--teachers", type=int, default=50)
+        parser.add_argument("--requests", type=int, default=30, help="Замеров на маршрут.")
+        parser.add_argument("--warmup", type=int, default=2)
+        parser.add_argument("--route-seconds", type=float, default=20.0,
+                            help="Бюджет времени на маршрут (медленные маршруты получат меньше замеров).")
+        parser.add_argument("--routes", default="", help="Только маршруты, содержащие подстроку (через запятую).")
+        parser.add_argument("--cold", action="store_true", help="Очищать кэш каталога перед каждым запросом.")
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--output", help="Записать JSON в файл.")
+        parser.add_argument("--baseline", help="JSON с базовыми результатами для сравнения.")
+        parser.add_argument("--save-baseline", action="store_true", help="Перезаписать --baseline текущими результатами.")
+        parser.add_argument("--threshold", type=float, default=0.25,
+                            help="Допустимый рост p95 (доля), по умолчанию 25%%.")
+        parser.add_argument("--min-delta-ms", type=float, default=2.0,
+                            help="Рост p95 меньше этого не считается регрессией (шум).")
+
+    def handle(self, *args, **options):
+        if options["save_baseline"] and not options["baseline"]:
+            raise CommandError("--save-baseline требует --baseline PATH")
+
+        self.rng = random.Random(options["seed"])
+        media = tempfile.TemporaryDirectory()
+        overrides = override_settings(
+            MEDIA_ROOT=media.name,
+            METRICS_DB_PATH=str(Path(media.name) / "metrics.sqlite3"),
+            METRICS_TOKEN=METRICS_TOKEN,
+            THROTTLE_CACHE_ALIAS="throttle",
+            CACHES={
+                **settings.CACHES,
+                "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "bench"},
+                # бенчмарк меряет код, а не лимиты
+                "throttle": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"},
+            },
+        )
+
+        # строка core.perf на каждый запрос утопит вывод
+        perf_logger = logging.getLogger("core.perf")
+        perf_level = perf_logger.level
+        perf_logger.setLevel(logging.WARNING)
+
+        setup_test_environment()
+        overrides.enable()
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            started = time.perf_counter()
+            fixtures = self._seed(options, Path(media.name))
+            seed_report = {
+                key: options[key]
+                for key in ("products", "images", "categories", "orders", "reviews", "documents", "teachers")
+            }
+            seed_report["seconds"] = round(time.perf_counter() - started, 1)
+            routes = self._run_routes(fixtures, options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            overrides.disable()
+            teardown_test_environment()
+            perf_logger.setLevel(perf_level)
+            media.cleanup()
+
+        report = {
+            "database": connection.vendor,
+            "seed": seed_report,
+            "options": {k: options[k] for k in ("requests", "warmup", "cold")},
+            "routes": routes,
+        }
+
+        regressions = []
+        if options["baseline"] and not options["save_baseline"]:
+            regressions = self._compare(routes, options)
+            report["baseline"] = options["baseline"]
+            report["regressions"] = regressions
+
+        text = json.dumps(report, indent=2, ensure_ascii=False)
+        if options["output"]:
+            Path(options["output"]).write_text(text + "\n", encoding="utf-8")
+        self.stdout.write(text)
+
+        if options["save_baseline"]:
+            Path(options["baseline"]).write_text(json.dumps({"routes": routes}, indent=2, ensure_ascii=False) + "\n")
+            self.stderr.write(f"Baseline сохранён: {options['baseline']}")
+        if regressions:
+            raise CommandError(f"Регрессия производительности: {len(regressions)} маршрут(ов), см. \"regressions\"")
+
+    # -------------------------
+    # Данные
+    # -------------------------
+
+    def _words(self, n: int) -> str:
+        return " ".join(self.rng.choice(WORDS) for _ in range(n))
+
+    def _seed(self, options, media_root: Path) -> dict:
+        rng = self.rng
+
+        SchoolInfo.objects.create(pk=1, address="ул. Школьная, 1", email="info@school.kz", phone="87010000000")
+        Teacher.objects.bulk_create(
+            [Teacher(name=f"Учитель {i}", subject=self._words(1), bio=self._words(30), order=i)
+             for i in range(options["teachers"])],
+            batch_size=BATCH,
+        )
+
+        categories = MerchCategory.objects.bulk_create(
+            [MerchCategory(name=f"Категория {i}", slug=f"bench-{i}") for i in range(options["categories"])],
+            batch_size=BATCH,
+        )
+
+        # bulk_create не вызывает сигналы: индекс поиска, счётчики и фрагменты пересобираем ниже
+        for start in range(0, options["products"], BATCH):
+            Product.objects.bulk_create([
+                Product(
+                    name=f"{self._words(2).capitalize()} {i}",
+                    description=self._words(25),
+                    price=Decimal(rng.randrange(500, 20000)) / 2,
+                    category=rng.choice(categories) if categories else None,
+                    in_stock=rng.random() > 0.1,
+                    sizes=["S", "M", "L"] if i % 3 == 0 else None,
+                    colors=["белый", "синий"] if i % 4 == 0 else None,
+                )
+                for i in range(start, min(start + BATCH, options["products"]))
+            ])
+        product_ids = list(Product.objects.values_list("id", flat=True))
+
+        images = (
+            ProductImage(product_id=pid, image=f"products/bench/{pid}_{j}.png", order=j)
+            for pid in product_ids for j in range(options["images"])
+        )
+        self._bulk(ProductImage, images)
+
+        if product_ids:
+            prices = dict(Product.objects.values_list("id", "price"))
+            for start in range(0, options["orders"], BATCH):
+                orders = Order.objects.bulk_create([
+                    Order(
+                        order_number=f"BENCH-{i:07d}",
+                        parent_name="Иванова Анна",
+                        children_names="Иван",
+                        phone="87011234567",
+                        total=Decimal("0"),
+                    )
+                    for i in range(start, min(start + BATCH, options["orders"]))
+                ])
+                if connection.features.can_return_rows_from_bulk_insert:
+                    order_ids = [o.pk for o in orders]
+                else:
+                    order_ids = list(Order.objects.filter(
+                        order_number__in=[o.order_number for o in orders]).values_list("pk", flat=True))
+                items = []
+                for oid in order_ids:
+                    for pid in rng.sample(product_ids, k=min(len(product_ids), rng.randint(1, 3))):
+                        items.append(OrderItem(order_id=oid, product_id=pid, quantity=rng.randint(1, 3),
+                                               price_at_order=prices[pid], name_at_order="Товар"))
+                OrderItem.objects.bulk_create(items, batch_size=BATCH)
+
+        self._bulk(Review, (
+            Review(name=f"Родитель {i}", text=self._words(40), rating=rng.randint(1, 5))
+            for i in range(options["reviews"])
+        ))
+
+        sample = media_root / "docs" / "bench" / "sample.pdf"
+        sample.parent.mkdir(parents=True, exist_ok=True)
+        sample.write_bytes(b"%PDF-1.4\n" + rng.randbytes(256 * 1024))
+        self._bulk(Document, (
+            Document(title=f"Документ {i}", category=rng.choice(["Приказы", "Расписание", "Отчёты"]),
+                     description=self._words(15), file="docs/bench/sample.pdf", original_name=f"doc-{i}.pdf",
+                     is_public=i % 10 != 0)
+            for i in range(options["documents"])
+        ))
+
+        quiet = StringIO()
+        call_command("rebuild_search_index", stdout=quiet)
+        call_command("rebuild_category_counts", stdout=quiet)
+        call_command("rebuild_catalog_fragments", stdout=quiet)
+
+        # без размеров/цветов — иначе заказу нужен selectedSize / selectedColor
+        product = Product.objects.filter(in_stock=True, sizes__isnull=True, colors__isnull=True).order_by("id").first()
+        return {
+            "teacher": Teacher.objects.order_by("id").first(),
+            "document": Document.objects.filter(is_public=True).order_by("id").first(),
+            "product": product,
+            "products": list(Product.objects.order_by("id").values_list("uuid", flat=True)[:20]),
+            "category": MerchCategory.objects.filter(products_count__gt=0).order_by("name").first(),
+        }
+
+    def _bulk(self, model, objects) -> None:
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) >= BATCH:
+                model.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            model.objects.bulk_create(batch)
+
+    # -------------------------
+    # Маршруты
+    # -------------------------
+
+    def _routes(self, fx) -> list[tuple[str, str, str, object]]:
+        """(имя, метод, путь, тело или функция i -> тело)."""
+        product, teacher, document, category = fx["product"], fx["teacher"], fx["document"], fx["category"]
+        ids = ",".join(str(u) for u in fx["products"])
+
+        def order_body(i):
+            # тело каждый раз разное — иначе сработает повтор по хэшу тела (идемпотентность)
+            return {
+                "parentName": f"Родитель {i}",
+                "childrenNames": "Иван",
+                "phone": "87011234567",
+                "items": [{"itemId": str(product.uuid), "quantity": 1}],
+                "total": str(product.price),
+            }
+
+        routes = [
+            ("school.list", "GET", "/api/school/", None),
+            ("teachers.list", "GET", "/api/teachers/", None),
+            ("reviews.list", "GET", "/api/reviews/", None),
+            ("reviews.create", "POST", "/api/reviews/",
+             lambda i: {"name": f"Родитель {i}", "text": "Спасибо учителям!", "rating": 5}),
+            ("documents.list", "GET", "/api/documents/", None),
+            ("products.list", "GET", "/api/products/", None),
+            ("v1.merch.list", "GET", "/api/v1/merch?page=1&limit=20", None),
+            ("v1.merch.list.last_page", "GET", "/api/v1/merch?page=10000&limit=20", None),
+            ("v1.merch.cursor", "GET", "/api/v1/merch?cursor=&limit=20", None),
+            ("v1.merch.search", "GET", "/api/v1/merch?search=футболка&limit=20", None),
+            ("v1.merch.batch", "GET", f"/api/v1/merch?ids={ids}", None),
+            ("v1.merch.categories", "GET", "/api/v1/merch/categories", None),
+            ("metrics", "GET", "/api/metrics", None),
+        ]
+        if teacher:
+            routes.append(("teachers.detail", "GET", f"/api/teachers/{teacher.pk}/", None))
+        if document:
+            routes.append(("documents.detail", "GET", f"/api/documents/{document.pk}/", None))
+            routes.append(("documents.download", "GET", f"/api/documents/{document.pk}/download/", None))
+        if product:
+            routes.append(("products.detail", "GET", f"/api/products/{product.pk}/", None))
+            routes.append(("product-images.list", "GET", f"/api/product-images/?product={product.pk}", None))
+            routes.append(("v1.merch.detail", "GET", f"/api/v1/merch/{product.uuid}", None))
+            routes.append(("v1.cart.quote", "POST", "/api/v1/cart/quote",
+                           lambda i: {"items": [{"itemId": str(product.uuid), "quantity": 2}]}))
+            routes.append(("v1.orders.create", "POST", "/api/v1/orders", order_body))
+        if category:
+            routes.append(("v1.merch.category", "GET", f"/api/v1/merch?category={category.name}&limit=20", None))
+        return sorted(routes)
+
+    def _run_routes(self, fx, options) -> dict:
+        client = Client(HTTP_AUTHORIZATION=f"Bearer {METRICS_TOKEN}")
+        wanted = [r.strip() for r in options["routes"].split(",") if r.strip()]
+        catalog_cache = caches[getattr(settings, "MERCH_CACHE_ALIAS", "default")]
+
+        results = {}
+        for name, method, path, body in self._routes(fx):
+            if wanted and not any(w in name for w in wanted):
+                continue
+            self.stderr.write(f"→ {name}")
+            counter = iter(range(10**9))
+
+            def call():
+                i = next(counter)
+                if options["cold"]:
+                    catalog_cache.clear()
+                if method == "GET":
+                    resp = client.get(path)
+                else:
+                    data = body(i) if callable(body) else body
+                    resp = client.post(path, data, content_type="application/json")
+                if hasattr(resp, "streaming_content"):
+                    b"".join(resp.streaming_content)  # файл тоже читаем, иначе время не честное
+                    resp.close()
+                return resp
+
+            for _ in range(options["warmup"]):
+                call()
+
+            latencies, queries, statuses = [], [], set()
+            deadline = time.perf_counter() + options["route_seconds"]
+            route_started = time.perf_counter()
+            while len(latencies) < options["requests"]:
+                with CaptureQueriesContext(connection) as ctx:
+                    t0 = time.perf_counter()
+                    resp = call()
+                    latencies.append(time.perf_counter() - t0)
+                queries.append(len(ctx.captured_queries))
+                statuses.add(resp.status_code)
+                if time.perf_counter() > deadline and len(latencies) >= 3:
+                    break
+            elapsed = time.perf_counter() - route_started
+
+            latencies.sort()
+            results[name] = {
+                "method": method,
+                "path": path,
+                "status": sorted(statuses),
+                "n": len(latencies),
+                "p50_ms": _ms(_percentile(latencies, 50)),
+                "p95_ms": _ms(_percentile(latencies, 95)),
+                "p99_ms": _ms(_percentile(latencies, 99)),
+                "mean_ms": _ms(sum(latencies) / len(latencies)),
+                "queries_per_request": round(sum(queries) / len(queries), 2),
+                "rps": round(len(latencies) / elapsed, 1),
+            }
+        return results
+
+    def _compare(self, routes: dict, options) -> list[dict]:
+        path = Path(options["baseline"])
+        if not path.exists():
+            raise CommandError(f"Нет файла baseline: {path} (создайте через --save-baseline)")
+        baseline = json.loads(path.read_text(encoding="utf-8"))["routes"]
+
+        regressions = []
+        for name, current in routes.items():
+            base = baseline.get(name)
+            if not base:
+                continue
+            limit = base["p95_ms"] * (1 + options["threshold"])
+            if current["p95_ms"] > limit and current["p95_ms"] - base["p95_ms"] > options["min_delta_ms"]:
+                regressions.append({"route": name, "metric": "p95_ms",
+                                    "baseline": base["p95_ms"], "current": current["p95_ms"]})
+            if current["queries_per_request"] > base["queries_per_request"]:
+                regressions.append({"route": name, "metric": "queries_per_request",
+                                    "baseline": base["queries_per_request"],
+                                    "current": current["queries_per_request"]})
+        return regressions
+
+
+def _percentile(sorted_values: list[float], p: float) -> float:
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    k = (len(sorted_values) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
@@ -0,0 +1,137 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connection, connections
+from django.test import override_settings
+
+from core.models import Order, Product
+from core.serializers import CreateOrderSerializer
+
+PRODUCTS = 200
+PRICE = Decimal("500.00")
+
+# «как было»: настройки SQLite по умолчанию (rollback journal, synchronous=FULL, BEGIN DEFERRED)
+BASELINE = {"pragmas": {}, "transaction_mode": None}
+
+
+class Command(BaseCommand):
+    help = (
+        "Бенчмарк конкурентной записи заказов в SQLite через настоящий путь заказа "
+        "(CreateOrderSerializer.create, Django ORM, connection_created + SQLITE_PRAGMAS, transaction_mode) "
+        "на временном файле БД: настройки по умолчанию против SQLITE_PRAGMAS + BEGIN IMMEDIATE. Печатает JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--writers", type=int, default=8)
+        parser.add_argument("--readers", type=int, default=4)
+        parser.add_argument("--seconds", type=float, default=5.0)
+        parser.add_argument("--items", type=int, default=3, help="Позиций в заказе.")
+
+    def handle(self, *args, **options):
+        tuned = {
+            "pragmas": getattr(settings, "SQLITE_PRAGMAS", {}),
+            "transaction_mode": settings.DATABASES["default"]["OPTIONS"].get("transaction_mode") or "IMMEDIATE",
+        }
+        report = {
+            "writers": options["writers"],
+            "readers": options["readers"],
+            "seconds": options["seconds"],
+            "baseline": self._run(BASELINE, options),
+            "tuned": self._run(tuned, options),
+        }
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def _run(self, profile: dict, options) -> dict:
+        # соединения потоков создаются из того же settings_dict, что и у текущего, —
+        # подменяем в нём файл БД и transaction_mode на время прогона
+        settings_dict = connection.settings_dict
+        saved = settings_dict["NAME"], dict(settings_dict["OPTIONS"])
+        connection.close()
+        with tempfile.TemporaryDirectory() as tmp, override_settings(SQLITE_PRAGMAS=profile["pragmas"]):
+            settings_dict["NAME"] = os.path.join(tmp, "bench.sqlite3")
+            settings_dict["OPTIONS"] = {**saved[1], "transaction_mode": profile["transaction_mode"]}
+            try:
+                call_command("migrate", verbosity=0, interactive=False)
+                return self._load(profile, options)
+            finally:
+                connection.close()
+                settings_dict["NAME"], settings_dict["OPTIONS"] = saved
+
+    def _load(self, profile: dict, options) -> dict:
+        products = [
+            Product.objects.create(name=f"Товар {i}", price=PRICE, in_stock=True) for i in range(1, PRODUCTS + 1)
+        ]
+        uuids = [str(p.uuid) for p in products]
+        connection.close()
+
+        stop = time.monotonic() + options["seconds"]
+        stats = {"orders": 0, "locked_errors": 0, "reads": 0}
+        lock = threading.Lock()
+
+        def bump(key):
+            with lock:
+                stats[key] += 1
+
+        def writer(n: int):
+            i = 0
+            try:
+                while time.monotonic() < stop:
+                    i += 1
+                    items = [
+                        {"itemId": uuids[(n * 7 + i * 3 + k) % PRODUCTS], "quantity": 1}
+                        for k in range(options["items"])
+                    ]
+                    serializer = CreateOrderSerializer(data={
+                        "parentName": "Иванова Анна",
+                        "childrenNames": "Иван",
+                        "phone": "87010000000",
+                        "items": items,
+                        "total": str(PRICE * len(items)),
+                    })
+                    serializer.is_valid(raise_exception=True)
+                    try:
+                        serializer.save()
+                        bump("orders")
+                    except OperationalError as exc:
+                        if "locked" not in str(exc) and "busy" not in str(exc):
+                            raise
+                        bump("locked_errors")
+            finally:
+                connections.close_all()
+
+        def reader(n: int):
+            try:
+                while time.monotonic() < stop:
+                    try:
+                        list(Product.objects.order_by("id").values_list("id", "name", "price")[n : n + 20])
+                        Order.objects.count()
+                        bump("reads")
+                    except OperationalError:
+                        bump("locked_errors")
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(options["writers"])]
+        threads += [threading.Thread(target=reader, args=(n,)) for n in range(options["readers"])]
+        started = time.monotonic()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.monotonic() - started
+
+        return {
+            "pragmas": profile["pragmas"],
+            "transaction_mode": profile["transaction_mode"] or "DEFERRED",
+            "orders": stats["orders"],
+            "orders_per_sec": round(stats["orders"] / elapsed, 1),
+            "reads_per_sec": round(stats["reads"] / elapsed, 1),
+            "locked_errors": stats["locked_errors"],
+        }
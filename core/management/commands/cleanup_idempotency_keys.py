@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core.idempotency import cleanup_expired
+
+
+class Command(BaseCommand):
+    help = "Удаляет просроченные ключи идемпотентности заказов."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        deleted = cleanup_expired(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Удалено ключей: {deleted}"))
@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from core.jobs import cleanup_finished
+
+
+class Command(BaseCommand):
+    help = "Удаляет выполненные (done) и упавшие (failed) фоновые задачи старше заданного срока."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--older-than", type=int, default=7, help="Дней для done-задач.")
+        parser.add_argument("--failed-older-than", type=int, default=30, help="Дней для failed-задач.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        deleted = cleanup_finished(
+            timedelta(days=options["older_than"]),
+            timedelta(days=options["failed_older_than"]),
+            batch_size=options["batch_size"],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Удалено задач: {deleted}"))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from core.notifications import dispatch
+
+
+class Command(BaseCommand):
+    help = "Доставляет ожидающие уведомления о заказах (обычно это делает run_worker)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=50)
+
+    def handle(self, *args, **options):
+        stats = dispatch(batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Отправлено: {stats['sent']}, отложено: {stats['retry']}, не доставлено: {stats['dead']}"
+            )
+        )
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from core.catalog_cache import bump_catalog_version
+from core.fragments import refresh_fragments
+from core.models import Product
+
+
+class Command(BaseCommand):
+    help = "Пересобирает предрассчитанные JSON-фрагменты товаров для API v1 (Product.api_fragment)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        ids = list(Product.objects.order_by("pk").values_list("pk", flat=True))
+        total = 0
+        for start in range(0, len(ids), batch_size):
+            total += refresh_fragments(ids[start : start + batch_size])
+        bump_catalog_version()
+        self.stdout.write(self.style.SUCCESS(f"Пересобрано фрагментов: {total}"))
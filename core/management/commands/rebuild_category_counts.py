@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+
+from core.catalog_cache import bump_catalog_version
+from core.facets import rebuild_category_counts
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает счётчики товаров по категориям мерча (products_count / in_stock_count)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS, help="Алиас БД (по умолчанию default).")
+
+    def handle(self, *args, **options):
+        count = rebuild_category_counts(using=options["database"])
+        bump_catalog_version(using=options["database"])
+        self.stdout.write(self.style.SUCCESS(f"Пересчитано категорий: {count}"))
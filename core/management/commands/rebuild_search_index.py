@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from core.search import fts_available, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Пересобирает полнотекстовый индекс товаров (SQLite FTS5)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+
+    def handle(self, *args, **options):
+        using = options["database"]
+        if not fts_available(using):
+            self.stdout.write(self.style.WARNING("FTS5 недоступен — поиск работает через icontains."))
+            return
+        count = rebuild_search_index(using)
+        self.stdout.write(self.style.SUCCESS(f"Проиндексировано товаров: {count}"))
@@ -0,0 +1,90 @@
+import logging
+import os
+import signal
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.jobs import claim, run_job
+
+logger = logging.getLogger("core.jobs")
+
+
+def _init_process():
+    # дочерний процесс (spawn/fork) — Django должен быть инициализирован, соединения свои
+    django.setup()
+    connections.close_all()
+
+
+def _execute(job_id: int, worker_id: str) -> str:
+    try:
+        return run_job(job_id, worker_id)
+    finally:
+        # соединения потока/процесса воркера не держим между задачами
+        connections.close_all()
+
+
+class Command(BaseCommand):
+    help = "Запускает воркер очереди фоновых задач (core.Job)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=4, help="Размер пула (по умолчанию 4).")
+        parser.add_argument("--pool", choices=("thread", "process"), default="thread")
+        parser.add_argument("--poll-interval", type=float, default=1.0, help="Пауза, когда очередь пуста (сек).")
+        parser.add_argument("--once", action="store_true", help="Выполнить готовые задачи и выйти (для cron).")
+
+    def handle(self, *args, **options):
+        concurrency = max(1, options["concurrency"])
+        poll_interval = options["poll_interval"]
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+
+        if options["pool"] == "process":
+            connections.close_all()  # не отдаём открытые соединения в fork
+            executor = ProcessPoolExecutor(max_workers=concurrency, initializer=_init_process)
+        else:
+            executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="job")
+
+        stopping = False
+
+        def stop(signum, frame):
+            nonlocal stopping
+            stopping = True
+            logger.info("Worker %s: получен сигнал %s, завершаем текущие задачи", worker_id, signum)
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        self.stdout.write(f"Worker {worker_id}: pool={options['pool']} concurrency={concurrency}")
+        in_flight = set()
+        processed = 0
+        try:
+            while not stopping:
+                finished = {f for f in in_flight if f.done()}
+                for f in finished:
+                    processed += 1
+                    if f.exception() is not None:
+                        logger.error("Worker %s: задача упала вне обработчика: %s", worker_id, f.exception())
+                in_flight -= finished
+
+                free = concurrency - len(in_flight)
+                ids = claim(worker_id, limit=free) if free else []
+                for job_id in ids:
+                    in_flight.add(executor.submit(_execute, job_id, worker_id))
+
+                if ids:
+                    continue
+                if options["once"] and not in_flight:
+                    break
+                if in_flight:
+                    wait(in_flight, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                else:
+                    time.sleep(poll_interval)
+        finally:
+            executor.shutdown(wait=True)
+
+        processed += sum(1 for f in in_flight if f.done())
+        self.stdout.write(self.style.SUCCESS(f"Worker {worker_id}: выполнено задач: {processed}"))
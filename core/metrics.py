@@ -0,0 +1,205 @@
+# core/metrics.py
+"""
+Счётчики и гистограммы для /api/metrics (текстовый формат Prometheus), общие для всех процессов.
+
+Каждый процесс копит приращения в памяти и раз в FLUSH_INTERVAL секунд (и перед отдачей
+/api/metrics) сбрасывает их одним UPSERT в SQLite-файл settings.METRICS_DB_PATH —
+это и есть общее хранилище: gunicorn-воркеры, ASGI-воркеры и run_worker пишут в один файл,
+эндпоинт суммирует всё. Отставание других процессов — не больше FLUSH_INTERVAL.
+
+Файл отдельный от основной БД: метрики не попадают в транзакции, роутер реплик и счётчик SQL.
+"""
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger("core.metrics")
+
+FLUSH_INTERVAL = 1.0
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# имя -> (тип, описание)
+METRICS = {
+    "http_requests_total": ("counter", "HTTP-запросы по view, методу и статусу"),
+    "http_request_duration_seconds": ("histogram", "Время обработки запроса по view"),
+    "http_request_db_queries": ("histogram", "SQL-запросов на HTTP-запрос по view"),
+    "throttle_rejections_total": ("counter", "Запросы, отклонённые троттлингом, по scope"),
+    "orders_created_total": ("counter", "Созданные заказы (без повторов по Idempotency-Key)"),
+    "api_errors_total": ("counter", "Ошибки API по коду custom_exception_handler"),
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS metric (
+    name TEXT NOT NULL,
+    labels TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (name, labels)
+)
+"""
+
+_lock = threading.Lock()
+_pending: dict[tuple[str, str], float] = {}
+_last_flush = time.monotonic()
+_conn: tuple[str, sqlite3.Connection] | None = None
+
+
+def _after_fork_in_child() -> None:
+    # gunicorn --preload, пул процессов run_worker: чужой буфер и соединение не наследуем,
+    # иначе приращения родителя будут записаны дважды
+    global _lock, _conn
+    _lock = threading.Lock()
+    _pending.clear()
+    _conn = None
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def _label_text(labels: dict) -> str:
+    def escape(v) -> str:
+        return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+    return ",".join(f'{k}="{escape(v)}"' for k, v in sorted(labels.items()))
+
+
+def _format_le(bound) -> str:
+    return "+Inf" if bound == float("inf") else repr(float(bound))
+
+
+def inc(name: str, value: float = 1, **labels) -> None:
+    key = (name, _label_text(labels))
+    with _lock:
+        _pending[key] = _pending.get(key, 0) + value
+    maybe_flush()
+
+
+def observe(name: str, value: float, buckets, **labels) -> None:
+    """Гистограмма: бакеты храним накопительными — суммы процессов складываются как есть."""
+    with _lock:
+        for bound in (*buckets, float("inf")):
+            if value <= bound:
+                key = (f"{name}_bucket", _label_text({**labels, "le": _format_le(bound)}))
+                _pending[key] = _pending.get(key, 0) + 1
+        for suffix, delta in (("_sum", value), ("_count", 1)):
+            key = (name + suffix, _label_text(labels))
+            _pending[key] = _pending.get(key, 0) + delta
+    maybe_flush()
+
+
+def observe_request(view: str, method: str, status: int, seconds: float, db_queries: int) -> None:
+    inc("http_requests_total", view=view, method=method, status=status)
+    observe("http_request_duration_seconds", seconds, LATENCY_BUCKETS, view=view)
+    observe("http_request_db_queries", db_queries, QUERY_BUCKETS, view=view)
+
+
+def _db_path() -> str:
+    return str(getattr(settings, "METRICS_DB_PATH", Path(settings.BASE_DIR) / "var" / "metrics.sqlite3"))
+
+
+def _connection() -> sqlite3.Connection:
+    global _conn
+    path = _db_path()
+    if _conn is None or _conn[0] != path:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(SCHEMA)
+        _conn = (path, conn)
+    return _conn[1]
+
+
+def flush() -> None:
+    global _last_flush
+    with _lock:
+        batch = list(_pending.items())
+        _pending.clear()
+        _last_flush = time.monotonic()
+        if not batch:
+            return
+        try:
+            conn = _connection()
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT INTO metric (name, labels, value) VALUES (?, ?, ?) "
+                "ON CONFLICT (name, labels) DO UPDATE SET value = value + excluded.value",
+                [(name, labels, value) for (name, labels), value in batch],
+            )
+            conn.execute("COMMIT")
+        except sqlite3.Error as exc:
+            # не теряем приращения: вернём их и попробуем при следующем сбросе
+            logger.warning("Metrics flush failed: %s", exc)
+            if _conn is not None and _conn[1].in_transaction:
+                _conn[1].execute("ROLLBACK")
+            for key, value in batch:
+                _pending[key] = _pending.get(key, 0) + value
+
+
+def maybe_flush() -> None:
+    if time.monotonic() - _last_flush >= FLUSH_INTERVAL:
+        flush()
+
+
+atexit.register(flush)
+
+
+def _metric_family(name: str) -> str:
+    for suffix in ("_bucket", "_sum", "_count"):
+        if name.endswith(suffix) and name[: -len(suffix)] in METRICS:
+            return name[: -len(suffix)]
+    return name
+
+
+_LE_RE = re.compile(r'(?:^|,)le="([^"]+)"')
+
+
+def _sort_key(row) -> tuple:
+    # бакеты гистограммы — по возрастанию le, затем _sum и _count
+    name, labels, _ = row
+    family = _metric_family(name)
+    le = _LE_RE.search(labels)
+    base_labels = _LE_RE.sub("", labels).lstrip(",")
+    order = {"_bucket": 0, "_sum": 1, "_count": 2}.get(name[len(family):], 0)
+    return family, base_labels, order, float(le.group(1)) if le else 0.0
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+def render() -> str:
+    """Все метрики всех процессов в текстовом формате Prometheus."""
+    flush()
+    with _lock:
+        rows = _connection().execute("SELECT name, labels, value FROM metric").fetchall()
+
+    by_family: dict[str, list[str]] = {}
+    for name, labels, value in sorted(rows, key=_sort_key):
+        sample = f"{name}{{{labels}}}" if labels else name
+        by_family.setdefault(_metric_family(name), []).append(f"{sample} {_format_value(value)}")
+
+    lines = []
+    for family, samples in sorted(by_family.items()):
+        kind, help_text = METRICS.get(family, ("untyped", ""))
+        lines.append(f"# HELP {family} {help_text}")
+        lines.append(f"# TYPE {family} {kind}")
+        lines.extend(samples)
+    return "\n".join(lines) + "\n"
+
+
+def reset() -> None:
+    """Очистить хранилище (тесты)."""
+    with _lock:
+        _pending.clear()
+        _connection().execute("DELETE FROM metric")
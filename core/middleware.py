@@ -0,0 +1,125 @@
+# core/middleware.py
+import logging
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.decorators import sync_and_async_middleware
+
+from . import metrics, nplusone, perf, routers
+
+perf_logger = logging.getLogger("core.perf")
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def _replica_ok(request) -> bool:
+    prefixes = tuple(getattr(settings, "REPLICA_READ_PATH_PREFIXES", ("/api/",)))
+    return request.method in SAFE_METHODS and request.path.startswith(prefixes)
+
+
+@sync_and_async_middleware
+def replica_routing_middleware(get_response):
+    """Размечает запрос для core.routers.PrimaryReplicaRouter."""
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            token = routers.begin_request(_replica_ok(request))
+            try:
+                return await get_response(request)
+            finally:
+                routers.end_request(token)
+    else:
+        def middleware(request):
+            token = routers.begin_request(_replica_ok(request))
+            try:
+                return get_response(request)
+            finally:
+                routers.end_request(token)
+    return middleware
+
+
+def _server_timing_allowed(request) -> bool:
+    # не по DEBUG: время и число SQL не показываем анонимам без явного SERVER_TIMING_PUBLIC
+    if getattr(settings, "SERVER_TIMING_PUBLIC", False):
+        return True
+    user = getattr(request, "user", None)
+    return bool(user is not None and user.is_staff)
+
+
+def _finish_perf(request, response, stats, show_timing: bool):
+    data = stats.as_dict()
+    view = perf.view_name(request)
+    if show_timing:
+        response["Server-Timing"] = perf.server_timing(stats)
+    perf_logger.info(
+        "view=%s method=%s path=%s status=%s total_ms=%s db_queries=%s db_ms=%s "
+        "serializer_ms=%s cache_hits=%s cache_misses=%s",
+        view, request.method, request.path, response.status_code,
+        data["total_ms"], data["db_queries"], data["db_ms"],
+        data["serializer_ms"], data["cache_hits"], data["cache_misses"],
+        extra={"perf": {"view": view, "status": response.status_code, **data}},
+    )
+    metrics.observe_request(view, request.method, response.status_code, stats.total_seconds, stats.db_queries)
+    return response
+
+
+@sync_and_async_middleware
+def perf_middleware(get_response):
+    """
+    Время запроса, запросы к БД, сериализаторы и кэш (см. core/perf.py):
+    строка в лог core.perf на каждый запрос, заголовок Server-Timing — staff и в DEBUG.
+    Ставить после AuthenticationMiddleware.
+    """
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            token = perf.start_request()
+            try:
+                response = await get_response(request)
+                stats = perf.current()
+                stats.stop()  # проверка staff ниже сама ходит в БД — её не считаем
+            finally:
+                perf.end_request(token)
+            show = await sync_to_async(_server_timing_allowed)(request)
+            return _finish_perf(request, response, stats, show)
+    else:
+        def middleware(request):
+            token = perf.start_request()
+            try:
+                response = get_response(request)
+                stats = perf.current()
+                stats.stop()  # проверка staff ниже сама ходит в БД — её не считаем
+            finally:
+                perf.end_request(token)
+            return _finish_perf(request, response, stats, _server_timing_allowed(request))
+    return middleware
+
+
+@sync_and_async_middleware
+def nplusone_middleware(get_response):
+    """
+    Детектор N+1 для разработки (см. core/nplusone.py).
+    Без NPLUSONE_DETECTION убирается из цепочки целиком.
+    """
+    if not getattr(settings, "NPLUSONE_DETECTION", False):
+        raise MiddlewareNotUsed
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            token = nplusone.start_request()
+            try:
+                response = await get_response(request)
+                log = nplusone.current()
+            finally:
+                nplusone.end_request(token)
+            nplusone.check(request, log)
+            return response
+    else:
+        def middleware(request):
+            token = nplusone.start_request()
+            try:
+                response = get_response(request)
+                log = nplusone.current()
+            finally:
+                nplusone.end_request(token)
+            nplusone.check(request, log)
+            return response
+    return middleware
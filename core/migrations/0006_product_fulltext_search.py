@@ -0,0 +1,58 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+
+    if connection.vendor == "postgresql":
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_product_fts ON core_product USING gin (("
+            "setweight(to_tsvector('russian', coalesce(\"core_product\".\"name\", '')), 'A') || "
+            "setweight(to_tsvector('russian', coalesce(\"core_product\".\"description\", '')), 'B')"
+            "))"
+        )
+        return
+
+    if connection.vendor != "sqlite":
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA compile_options")
+        if "ENABLE_FTS5" not in {row[0] for row in cursor.fetchall()}:
+            # без FTS5 поиск работает через icontains (см. core/search.py)
+            return
+
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS core_product_fts USING fts5("
+        "name, description, tokenize = 'unicode61 remove_diacritics 2')"
+    )
+
+    Product = apps.get_model("core", "Product")
+    rows = [
+        (pk, (name or "").lower().replace("ё", "е"), (description or "").lower().replace("ё", "е"))
+        for pk, name, description in Product.objects.values_list("id", "name", "description")
+    ]
+    if rows:
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                "INSERT INTO core_product_fts (rowid, name, description) VALUES (%s, %s, %s)", rows
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS idx_product_fts")
+    elif vendor == "sqlite":
+        schema_editor.execute("DROP TABLE IF EXISTS core_product_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_alter_product_uuid'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-15 04:06
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def fill_counters(apps, schema_editor):
+    MerchCategory = apps.get_model("core", "MerchCategory")
+    for category in MerchCategory.objects.annotate(
+        total=Count("products"),
+        stock=Count("products", filter=Q(products__in_stock=True)),
+    ):
+        MerchCategory.objects.filter(pk=category.pk).update(
+            products_count=category.total,
+            in_stock_count=category.stock,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_product_fulltext_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='merchcategory',
+            name='in_stock_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В наличии'),
+        ),
+        migrations.AddField(
+            model_name='merchcategory',
+            name='products_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Товаров'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
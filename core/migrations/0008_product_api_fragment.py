@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-15 04:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_merchcategory_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='api_fragment',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+    ]
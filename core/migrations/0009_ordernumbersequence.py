@@ -0,0 +1,44 @@
+# Generated by Django 5.2.6 on 2026-10-15 04:09
+
+import re
+
+from django.db import migrations, models
+
+
+def seed_sequences(apps, schema_editor):
+    # продолжаем нумерацию после уже выданных номеров ORD-<год>-<n>
+    Order = apps.get_model("core", "Order")
+    OrderNumberSequence = apps.get_model("core", "OrderNumberSequence")
+
+    last: dict[int, int] = {}
+    for number in Order.objects.values_list("order_number", flat=True):
+        m = re.fullmatch(r"ORD-(\d{4})-(\d+)", number or "")
+        if m:
+            year, value = int(m.group(1)), int(m.group(2))
+            last[year] = max(last.get(year, 0), value)
+
+    OrderNumberSequence.objects.bulk_create(
+        [OrderNumberSequence(year=year, last_value=value) for year, value in last.items()]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_product_api_fragment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderNumberSequence',
+            fields=[
+                ('year', models.PositiveIntegerField(primary_key=True, serialize=False)),
+                ('last_value', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Счётчик номеров заказов',
+                'verbose_name_plural': 'Счётчики номеров заказов',
+            },
+        ),
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-15 04:31
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def fill_content_hash(apps, schema_editor):
+    Document = apps.get_model("core", "Document")
+    for doc in Document.objects.exclude(file="").iterator():
+        digest, size = hashlib.sha256(), 0
+        try:
+            with doc.file.open("rb") as f:
+                for chunk in f.chunks():
+                    digest.update(chunk)
+                    size += len(chunk)
+        except OSError:
+            continue  # файла нет на диске — ETag не будет, отдадим как раньше
+        Document.objects.filter(pk=doc.pk).update(content_hash=digest.hexdigest(), file_size=size)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_ordernotification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='file_size',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(fill_content_hash, migrations.RunPython.noop),
+    ]
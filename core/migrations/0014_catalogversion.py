@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-15 04:41
+
+import time
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def create_row(apps, schema_editor):
+    CatalogVersion = apps.get_model("core", "CatalogVersion")
+    # стартуем с текущего времени, а не с 1: версии (и ETag-и) не повторяют выданные до миграции
+    CatalogVersion.objects.get_or_create(pk=1, defaults={"version": time.time_ns()})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_document_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=1)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Версия каталога',
+                'verbose_name_plural': 'Версия каталога',
+            },
+        ),
+        migrations.RunPython(create_row, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-15 04:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_catalogversion'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='idx_product_created_at',
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['created_at', 'uuid'], name='idx_product_created_uuid'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-15 05:10
+
+from django.db import migrations
+
+
+def backfill_fragments(apps, schema_editor):
+    # фрагмент строит текущий MerchItemSerializer, исторической модели тут мало;
+    # на пустой/уже заполненной базе до текущей модели не доходим
+    HistoricalProduct = apps.get_model("core", "Product")
+    using = schema_editor.connection.alias
+    if not HistoricalProduct.objects.using(using).filter(api_fragment="").exists():
+        return
+
+    from core.fragments import refresh_fragments
+
+    ids = list(HistoricalProduct.objects.using(using).filter(api_fragment="").values_list("pk", flat=True))
+    for start in range(0, len(ids), 500):
+        refresh_fragments(ids[start : start + 500], using=using)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_product_created_uuid_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_fragments, migrations.RunPython.noop),
+    ]
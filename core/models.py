@@ -1,10 +1,11 @@
 from __future__ import annotations
 
+import hashlib
 import os
 import uuid
 
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import connections, models, transaction
 from django.utils import timezone
 from django.utils.text import slugify
 from django.utils.translation import gettext_lazy as _
@@ -100,6 +101,10 @@ class Document(models.Model):
     is_public = models.BooleanField(default=True, db_index=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
+    # sha256 и размер содержимого: ETag и Content-Length при скачивании без открытия файла
+    content_hash = models.CharField(max_length=64, blank=True, editable=False)
+    file_size = models.PositiveBigIntegerField(null=True, blank=True, editable=False)
+
     class Meta:
         ordering = ["-uploaded_at"]
         verbose_name = "Документ"
@@ -114,8 +119,18 @@ class Document(models.Model):
     def save(self, *args, **kwargs):
         if not self.original_name and self.file and hasattr(self.file, "name"):
             self.original_name = os.path.basename(self.file.name)
+        if self.file and not self.file._committed:
+            # новый файл (загрузка через API/админку) ещё в памяти или во временном файле
+            digest = hashlib.sha256()
+            for chunk in self.file.chunks():
+                digest.update(chunk)
+            self.content_hash, self.file_size = digest.hexdigest(), self.file.size
         super().save(*args, **kwargs)
 
+    @property
+    def etag(self) -> str | None:
+        return f'"{self.content_hash}"' if self.content_hash else None
+
 
 # -------------------------
 # Merch / Shop models (API v1)
@@ -126,6 +141,10 @@ class MerchCategory(models.Model):
     name = models.CharField(max_length=120, unique=True, verbose_name=_("Название"))
     slug = models.SlugField(max_length=140, unique=True, blank=True, verbose_name=_("Slug"))
 
+    # материализованные счётчики (см. core/facets.py), руками не редактируются
+    products_count = models.PositiveIntegerField(default=0, editable=False, verbose_name=_("Товаров"))
+    in_stock_count = models.PositiveIntegerField(default=0, editable=False, verbose_name=_("В наличии"))
+
     class Meta:
         verbose_name = "Категория мерча"
         verbose_name_plural = "Категории мерча"
@@ -180,6 +199,9 @@ class Product(models.Model):
 
     uuid = models.UUIDField(default=uuid.uuid4, unique=True, editable=False, db_index=True)
 
+    # готовый JSON для API v1 (см. core/fragments.py), пересобирается сигналами
+    api_fragment = models.TextField(blank=True, default="", editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True, verbose_name=_("Создано"))
     updated_at = models.DateTimeField(auto_now=True, verbose_name=_("Обновлено"))
 
@@ -191,9 +213,19 @@ class Product(models.Model):
             models.Index(fields=["in_stock"], name="idx_product_in_stock"),
             models.Index(fields=["category"], name="idx_product_category"),
             models.Index(fields=["name"], name="idx_product_name"),
-            models.Index(fields=["created_at"], name="idx_product_created_at"),
+            # uuid — тай-брейкер keyset-пагинации (core/views_api_v1.py cursor_queryset)
+            models.Index(fields=["created_at", "uuid"], name="idx_product_created_uuid"),
         ]
 
+    def save(self, *args, **kwargs):
+        # сигналы пересчёта счётчиков категорий выполняются в той же транзакции
+        with transaction.atomic(using=kwargs.get("using") or "default"):
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get("using") or "default"):
+            return super().delete(*args, **kwargs)
+
     def __str__(self) -> str:
         return self.name
 
@@ -226,6 +258,63 @@ class ProductImage(models.Model):
         return f"{self.product_id}: {filename}"
 
 
+class CatalogVersion(models.Model):
+    """
+    Версия публичного каталога (одна строка, pk=1) для кэша и ETag/Last-Modified API v1.
+    Увеличивается в той же транзакции, что и правка товара / фото / категории (core/catalog_cache.py).
+    """
+    version = models.PositiveBigIntegerField(default=1)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Версия каталога"
+        verbose_name_plural = "Версия каталога"
+
+    def __str__(self):
+        return f"v{self.version} ({self.changed_at:%Y-%m-%d %H:%M:%S})"
+
+
+class OrderNumberSequence(models.Model):
+    """Счётчик номеров заказов по годам: ORD-<год>-<номер>."""
+    year = models.PositiveIntegerField(primary_key=True)
+    last_value = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Счётчик номеров заказов"
+        verbose_name_plural = "Счётчики номеров заказов"
+
+    def __str__(self):
+        return f"{self.year}: {self.last_value}"
+
+    @classmethod
+    def next_value(cls, year: int, using: str = "default") -> int:
+        """
+        Атомарно выделяет следующий номер за год одним upsert-запросом
+        (INSERT ... ON CONFLICT DO UPDATE ... RETURNING).
+        """
+        connection = connections[using]
+        table = connection.ops.quote_name(cls._meta.db_table)
+        with connection.cursor() as cursor:
+            if connection.features.can_return_columns_from_insert:
+                cursor.execute(
+                    f"INSERT INTO {table} (year, last_value) VALUES (%s, 1) "
+                    f"ON CONFLICT (year) DO UPDATE SET last_value = {table}.last_value + 1 "
+                    f"RETURNING last_value",
+                    [year],
+                )
+                return cursor.fetchone()[0]
+
+            # старый SQLite без RETURNING
+            with transaction.atomic(using=using):
+                cursor.execute(
+                    f"INSERT INTO {table} (year, last_value) VALUES (%s, 0) ON CONFLICT (year) DO NOTHING",
+                    [year],
+                )
+                cursor.execute(f"UPDATE {table} SET last_value = last_value + 1 WHERE year = %s", [year])
+                cursor.execute(f"SELECT last_value FROM {table} WHERE year = %s", [year])
+                return cursor.fetchone()[0]
+
+
 class Order(models.Model):
     id = models.BigAutoField(primary_key=True)
     uuid = models.UUIDField(default=uuid.uuid4, unique=True, editable=False, db_index=True)
@@ -252,13 +341,12 @@ class Order(models.Model):
         ]
 
     def save(self, *args, **kwargs):
-        creating = self._state.adding
-        super().save(*args, **kwargs)
-
-        if creating and not self.order_number:
+        # номер выделяем заранее из годовой последовательности -> заказ пишется одним INSERT
+        if self._state.adding and not self.order_number:
             year = (self.created_at or timezone.now()).year
-            self.order_number = f"ORD-{year}-{self.id:06d}"
-            Order.objects.filter(pk=self.pk).update(order_number=self.order_number)
+            seq = OrderNumberSequence.next_value(year, using=kwargs.get("using") or "default")
+            self.order_number = f"ORD-{year}-{seq:06d}"
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.order_number or str(self.uuid)
@@ -288,4 +376,114 @@ class OrderItem(models.Model):
         ]
 
     def __str__(self):
-        return f"{self.order_id}: {self.name_at_order} x {self.quantity}"
\ No newline at end of file
+        return f"{self.order_id}: {self.name_at_order} x {self.quantity}"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Сохранённый ответ POST /api/v1/orders для повторов с тем же Idempotency-Key
+    (или тем же телом запроса, если заголовка нет). Просроченные удаляет
+    `python manage.py cleanup_idempotency_keys`.
+    """
+    key = models.CharField(max_length=300, unique=True)
+    request_hash = models.CharField(max_length=64)
+
+    response_status = models.PositiveSmallIntegerField()
+    response_data = models.JSONField()
+    order = models.ForeignKey(Order, null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Ключ идемпотентности"
+        verbose_name_plural = "Ключи идемпотентности"
+        indexes = [
+            models.Index(fields=["expires_at"], name="idx_idempotency_expires"),
+        ]
+
+    def __str__(self):
+        return self.key
+
+
+class Job(models.Model):
+    """Фоновая задача (см. core/jobs.py, `python manage.py run_worker`)."""
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "В очереди"),
+        (STATUS_RUNNING, "Выполняется"),
+        (STATUS_DONE, "Выполнена"),
+        (STATUS_FAILED, "Ошибка"),
+    ]
+
+    name = models.CharField(max_length=120)
+    payload = models.JSONField(default=dict, blank=True)
+    priority = models.SmallIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+
+    locked_by = models.CharField(max_length=120, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        verbose_name = "Фоновая задача"
+        verbose_name_plural = "Фоновые задачи"
+        indexes = [
+            models.Index(fields=["status", "-priority", "run_at"], name="idx_job_claim"),
+            models.Index(fields=["status", "locked_at"], name="idx_job_locked"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+
+class OrderNotification(models.Model):
+    """
+    Outbox уведомлений о заказах: пишется в одной транзакции с Order,
+    доставляется фоново (core/notifications.py) в настроенные каналы.
+    """
+    STATUS_PENDING = "pending"
+    STATUS_SENDING = "sending"
+    STATUS_SENT = "sent"
+    STATUS_DEAD = "dead"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Ожидает"),
+        (STATUS_SENDING, "Отправляется"),
+        (STATUS_SENT, "Отправлено"),
+        (STATUS_DEAD, "Не доставлено"),
+    ]
+
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="notifications")
+    sink = models.CharField(max_length=60)
+    payload = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        verbose_name = "Уведомление о заказе"
+        verbose_name_plural = "Уведомления о заказах"
+        indexes = [
+            models.Index(fields=["status", "sink", "next_attempt_at"], name="idx_ordernotif_pending"),
+        ]
+
+    def __str__(self):
+        return f"{self.order_id} → {self.sink} ({self.status})"
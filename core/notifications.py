@@ -0,0 +1,285 @@
+# core/notifications.py
+"""
+Уведомления о новых заказах (email / Telegram / webhook) без задержки checkout.
+
+1. CreateOrderSerializer.create пишет строки OrderNotification (outbox) — по одной на канал —
+   в той же транзакции, что и заказ, и ставит задачу "core.dispatch_order_notifications".
+2. Диспетчер (задача воркера или `python manage.py dispatch_notifications`) пачками забирает
+   ожидающие строки, отправляет через канал, при ошибке откладывает с backoff,
+   после ORDER_NOTIFICATION_MAX_ATTEMPTS помечает как dead (dead letter, видно в админке).
+
+Каналы настраиваются в settings.ORDER_NOTIFICATION_SINKS:
+
+    ORDER_NOTIFICATION_SINKS = [
+        {"NAME": "email", "BACKEND": "core.notifications.EmailSink",
+         "OPTIONS": {"recipients": ["shop@school.kz"]}},
+        {"NAME": "hook", "BACKEND": "core.notifications.WebhookSink",
+         "OPTIONS": {"url": "https://example.com/hooks/orders"}},
+    ]
+"""
+from __future__ import annotations
+
+import json
+import logging
+import urllib.request
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.core import mail
+from django.db.models import F, Min, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .jobs import backoff_seconds, enqueue, task
+from .models import Job, OrderNotification
+
+logger = logging.getLogger("core.notifications")
+
+DISPATCH_TASK = "core.dispatch_order_notifications"
+STALE_LOCK_SECONDS = 600
+
+
+# -------------------------
+# Sinks
+# -------------------------
+
+class BaseSink:
+    def __init__(self, name: str, **options):
+        self.name = name
+        self.options = options
+
+    def send(self, message: dict) -> None:
+        raise NotImplementedError
+
+    def send_batch(self, messages: list[dict]) -> list[Exception | None]:
+        """Результат по каждому сообщению: None — доставлено, иначе исключение."""
+        results: list[Exception | None] = []
+        for message in messages:
+            try:
+                self.send(message)
+                results.append(None)
+            except Exception as exc:
+                results.append(exc)
+        return results
+
+
+def format_order_text(message: dict) -> str:
+    lines = [
+        f"Новый заказ {message['orderNumber']}",
+        f"Родитель: {message['parentName']}",
+        f"Дети: {message['childrenNames']}",
+        f"Телефон: {message['phone']}",
+        "",
+    ]
+    for i in message["items"]:
+        variant = ", ".join(x for x in (i.get("size"), i.get("color")) if x)
+        name = f"{i['name']} ({variant})" if variant else i["name"]
+        lines.append(f"• {name} × {i['quantity']} = {i['lineTotal']}")
+    lines += ["", f"Итого: {message['total']}"]
+    if message.get("comment"):
+        lines.append(f"Комментарий: {message['comment']}")
+    return "\n".join(lines)
+
+
+class EmailSink(BaseSink):
+    """Email через django.core.mail: одна SMTP-сессия на пачку."""
+
+    def send_batch(self, messages: list[dict]) -> list[Exception | None]:
+        recipients = self.options.get("recipients") or []
+        from_email = self.options.get("from_email") or settings.DEFAULT_FROM_EMAIL
+        results: list[Exception | None] = []
+        with mail.get_connection(fail_silently=False) as connection:
+            for message in messages:
+                try:
+                    mail.EmailMessage(
+                        subject=f"Новый заказ {message['orderNumber']}",
+                        body=format_order_text(message),
+                        from_email=from_email,
+                        to=recipients,
+                        connection=connection,
+                    ).send()
+                    results.append(None)
+                except Exception as exc:
+                    results.append(exc)
+        return results
+
+
+class WebhookSink(BaseSink):
+    """POST JSON на url. OPTIONS: url, timeout (сек), headers (dict)."""
+
+    def _post(self, url: str, body: dict) -> None:
+        request = urllib.request.Request(
+            url,
+            data=json.dumps(body, ensure_ascii=False).encode(),
+            headers={"Content-Type": "application/json", **(self.options.get("headers") or {})},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.options.get("timeout", 5)) as resp:
+            if resp.status >= 300:
+                raise RuntimeError(f"HTTP {resp.status}")
+
+    def send(self, message: dict) -> None:
+        self._post(self.options["url"], {"event": "order.created", "order": message})
+
+
+class TelegramSink(WebhookSink):
+    """Сообщение в чат через Bot API. OPTIONS: token, chat_id."""
+
+    def send(self, message: dict) -> None:
+        base = self.options.get("api_url", "https://api.telegram.org")
+        self._post(
+            f"{base}/bot{self.options['token']}/sendMessage",
+            {"chat_id": self.options["chat_id"], "text": format_order_text(message)},
+        )
+
+
+@lru_cache(maxsize=None)
+def _sinks_from_settings(config: str) -> dict[str, BaseSink]:
+    sinks = {}
+    for entry in json.loads(config):
+        backend = import_string(entry["BACKEND"])
+        sinks[entry["NAME"]] = backend(entry["NAME"], **entry.get("OPTIONS", {}))
+    return sinks
+
+
+def get_sinks() -> dict[str, BaseSink]:
+    config = getattr(settings, "ORDER_NOTIFICATION_SINKS", [])
+    return _sinks_from_settings(json.dumps(config, sort_keys=True))
+
+
+# -------------------------
+# Outbox
+# -------------------------
+
+def build_order_message(order, prepared) -> dict:
+    return {
+        "orderId": str(order.uuid),
+        "orderNumber": order.order_number,
+        "parentName": order.parent_name,
+        "childrenNames": order.children_names,
+        "phone": order.phone,
+        "total": str(order.total),
+        "comment": order.comment,
+        "items": [
+            {
+                "itemId": str(p.uuid),
+                "name": p.name,
+                "quantity": qty,
+                "size": sel_size,
+                "color": sel_color,
+                "price": str(p.price),
+                "lineTotal": str(p.price * qty),
+            }
+            for p, qty, sel_size, sel_color in prepared
+        ],
+    }
+
+
+def record_order_created(order, prepared) -> int:
+    """Пишет outbox-строки для заказа (вызывать внутри транзакции создания заказа)."""
+    sinks = get_sinks()
+    if not sinks:
+        return 0
+    message = build_order_message(order, prepared)
+    OrderNotification.objects.bulk_create(
+        [OrderNotification(order=order, sink=name, payload=message) for name in sinks]
+    )
+    enqueue(DISPATCH_TASK, priority=10)
+    return len(sinks)
+
+
+def _claim(sink: str, limit: int) -> list[OrderNotification]:
+    now = timezone.now()
+    stale = now - timedelta(seconds=STALE_LOCK_SECONDS)
+    ids = list(
+        OrderNotification.objects.filter(
+            Q(status=OrderNotification.STATUS_PENDING, next_attempt_at__lte=now)
+            | Q(status=OrderNotification.STATUS_SENDING, locked_at__lt=stale),
+            sink=sink,
+        )
+        .order_by("next_attempt_at", "id")
+        .values_list("pk", flat=True)[:limit]
+    )
+    if not ids:
+        return []
+    # «захват» одной командой: берём только те строки, что всё ещё доступны
+    OrderNotification.objects.filter(
+        Q(status=OrderNotification.STATUS_PENDING) | Q(status=OrderNotification.STATUS_SENDING, locked_at__lt=stale),
+        pk__in=ids,
+    ).update(status=OrderNotification.STATUS_SENDING, locked_at=now, attempts=F("attempts") + 1)
+    return list(
+        OrderNotification.objects.filter(pk__in=ids, status=OrderNotification.STATUS_SENDING, locked_at=now)
+        .order_by("next_attempt_at", "id")
+    )
+
+
+def dispatch(batch_size: int = 50) -> dict[str, int]:
+    """Одна итерация доставки по всем каналам. Возвращает счётчики sent/retry/dead."""
+    max_attempts = getattr(settings, "ORDER_NOTIFICATION_MAX_ATTEMPTS", 8)
+    stats = {"sent": 0, "retry": 0, "dead": 0}
+
+    for name, sink in get_sinks().items():
+        while True:
+            batch = _claim(name, batch_size)
+            if not batch:
+                break
+            try:
+                results = sink.send_batch([n.payload for n in batch])
+                sink_down = False
+            except Exception as exc:
+                # канал недоступен целиком (SMTP не отвечает и т.п.): ошибка у каждой строки
+                # пачки — обычный retry/dead letter, остальные каналы доставляем дальше
+                logger.warning("Sink %s failed for a batch of %s: %r", name, len(batch), exc)
+                results = [exc] * len(batch)
+                sink_down = True
+            now = timezone.now()
+
+            sent_ids = [n.pk for n, err in zip(batch, results) if err is None]
+            if sent_ids:
+                OrderNotification.objects.filter(pk__in=sent_ids).update(
+                    status=OrderNotification.STATUS_SENT, sent_at=now, locked_at=None, last_error=""
+                )
+                stats["sent"] += len(sent_ids)
+
+            for n, err in zip(batch, results):
+                if err is None:
+                    continue
+                if n.attempts >= max_attempts:
+                    logger.error("Notification %s → %s dead after %s attempts: %s", n.order_id, name, n.attempts, err)
+                    OrderNotification.objects.filter(pk=n.pk).update(
+                        status=OrderNotification.STATUS_DEAD, locked_at=None, last_error=repr(err)
+                    )
+                    stats["dead"] += 1
+                else:
+                    OrderNotification.objects.filter(pk=n.pk).update(
+                        status=OrderNotification.STATUS_PENDING,
+                        locked_at=None,
+                        next_attempt_at=now + timedelta(seconds=backoff_seconds(n.attempts)),
+                        last_error=repr(err),
+                    )
+                    stats["retry"] += 1
+
+            if sink_down or len(batch) < batch_size:
+                break
+    return stats
+
+
+def schedule_next_dispatch() -> None:
+    """Ставит задачу диспетчера на момент ближайшего отложенного повтора (если ещё не стоит)."""
+    next_at = OrderNotification.objects.filter(status=OrderNotification.STATUS_PENDING).aggregate(
+        m=Min("next_attempt_at")
+    )["m"]
+    if next_at is None:
+        return
+    already = Job.objects.filter(name=DISPATCH_TASK, status=Job.STATUS_QUEUED, run_at__lte=next_at).exists()
+    if not already:
+        delay = max(0.0, (next_at - timezone.now()).total_seconds())
+        enqueue(DISPATCH_TASK, delay=delay, priority=10)
+
+
+@task(DISPATCH_TASK)
+def dispatch_order_notifications(payload: dict):
+    stats = dispatch()
+    schedule_next_dispatch()
+    return stats
@@ -0,0 +1,157 @@
+# core/nplusone.py
+"""
+Детектор N+1 для разработки: NPLUSONE_DETECTION = True (DJANGO_NPLUSONE=1).
+
+nplusone_middleware (core/middleware.py) открывает QueryLog на запрос (contextvar),
+record_query (execute_wrapper, как в core/perf.py) складывает в него SQL, сгруппированный
+по нормализованному тексту (литералы -> ?) и месту вызова в коде проекта.
+Группа больше NPLUSONE_THRESHOLD запросов — это N+1: при NPLUSONE_RAISE (по умолчанию DEBUG)
+запрос падает с NPlusOneError, иначе — warning в лог core.nplusone со стеком вызова.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import re
+import sys
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger("core.nplusone")
+
+STACK_DEPTH = 5
+
+# обёртки core (execute_wrapper'ы, middleware, TimedSerializerMixin) — не место вызова
+_SKIP_FILES = {
+    os.path.join(os.path.dirname(__file__), name) for name in ("nplusone.py", "perf.py", "middleware.py")
+}
+
+_SQL_LITERALS = [
+    (re.compile(r"%s"), "?"),  # execute_wrapper видит SQL до подстановки параметров
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"\(\?(?:, \?)*\)"), "(...)"),
+]
+
+
+class NPlusOneError(Exception):
+    pass
+
+
+def normalize_sql(sql: str) -> str:
+    """Строки, числа, %s и списки IN (...) -> плейсхолдеры: один и тот же запрос с разными id."""
+    for pattern, repl in _SQL_LITERALS:
+        sql = pattern.sub(repl, sql)
+    return sql
+
+
+def _in_project(filename: str | None, root: str) -> bool:
+    return bool(filename) and filename.startswith(root) and "site-packages" not in filename
+
+
+def _describe(frame, root: str) -> str | None:
+    """
+    Кадр кода проекта -> «core/serializers.py:42 in get_image».
+    Кадр библиотеки, вызванный на объекте проекта (DRF гоняет ProductSerializer.to_representation
+    и ListModelMixin.list у наших классов) -> «ProductSerializer.to_representation».
+    """
+    filename = frame.f_code.co_filename
+    if filename in _SKIP_FILES:
+        return None
+    if _in_project(filename, root):
+        return f"{os.path.relpath(filename, root)}:{frame.f_lineno} in {frame.f_code.co_name}"
+    owner = type(frame.f_locals.get("self"))
+    module = sys.modules.get(owner.__module__)
+    if _in_project(getattr(module, "__file__", None), root):
+        return f"{owner.__qualname__}.{frame.f_code.co_name}"
+    return None
+
+
+def _project_stack() -> list[str]:
+    """Кадры проекта, от места запроса к БД вверх."""
+    root = str(settings.BASE_DIR) + os.sep
+    stack = []
+    frame = sys._getframe(2)
+    while frame is not None and len(stack) < STACK_DEPTH:
+        described = _describe(frame, root)
+        if described and described not in stack:
+            stack.append(described)
+        frame = frame.f_back
+    return stack
+
+
+@dataclass
+class QueryGroup:
+    sql: str
+    stack: list[str]
+    count: int = 0
+
+
+@dataclass
+class QueryLog:
+    groups: dict[tuple[str, str], QueryGroup] = field(default_factory=dict)
+
+    def add(self, sql: str) -> None:
+        stack = _project_stack()
+        key = (normalize_sql(sql), stack[0] if stack else "")
+        group = self.groups.get(key)
+        if group is None:
+            group = self.groups[key] = QueryGroup(key[0], stack)
+        group.count += 1
+
+    def repeated(self, threshold: int) -> list[QueryGroup]:
+        return sorted((g for g in self.groups.values() if g.count > threshold), key=lambda g: -g.count)
+
+
+_current: ContextVar[QueryLog | None] = ContextVar("nplusone_log", default=None)
+
+
+def start_request():
+    return _current.set(QueryLog())
+
+
+def end_request(token) -> None:
+    _current.reset(token)
+
+
+def current() -> QueryLog | None:
+    return _current.get()
+
+
+def record_query(execute, sql, params, many, context):
+    log = _current.get()
+    if log is not None:
+        log.add(sql)
+    return execute(sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_query_log(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def report(groups: list[QueryGroup]) -> str:
+    lines = []
+    for group in groups:
+        lines.append(f"{group.count} × {group.sql}")
+        lines.extend(f"    {frame}" for frame in group.stack or ["(вне кода проекта)"])
+    return "\n".join(lines)
+
+
+def check(request, log: QueryLog) -> None:
+    """Вызывается после ответа: N+1 -> NPlusOneError (NPLUSONE_RAISE) или warning."""
+    groups = log.repeated(getattr(settings, "NPLUSONE_THRESHOLD", 5))
+    if not groups:
+        return
+    message = f"N+1 в {request.method} {request.path}:\n{report(groups)}"
+    if getattr(settings, "NPLUSONE_RAISE", settings.DEBUG):
+        raise NPlusOneError(message)
+    logger.warning(
+        message,
+        extra={"nplusone": [{"sql": g.sql, "count": g.count, "stack": g.stack} for g in groups]},
+    )
@@ -0,0 +1,143 @@
+# core/perf.py
+"""
+Метрики одного запроса: время, запросы к БД, сериализаторы, кэш каталога.
+
+perf_middleware (core/middleware.py) открывает RequestStats на запрос (contextvar),
+остальные части пишут в него:
+- record_query — execute_wrapper, вешается на каждое соединение (connection_created);
+- TimedSerializerMixin — время to_representation / run_validation сериализаторов core;
+- count() — попадания/промахи кэша каталога (catalog_cache.get_or_build).
+Вне запроса (команды, воркер) всё это — no-op.
+"""
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from rest_framework.fields import empty
+
+
+@dataclass
+class RequestStats:
+    started: float = field(default_factory=time.perf_counter)
+    finished: float | None = None
+    db_queries: int = 0
+    db_seconds: float = 0.0
+    spans: dict[str, float] = field(default_factory=dict)
+    counters: dict[str, int] = field(default_factory=dict)
+    _depth: dict[str, int] = field(default_factory=dict)
+
+    def stop(self) -> None:
+        self.finished = time.perf_counter()
+
+    @property
+    def total_seconds(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    def as_dict(self) -> dict:
+        return {
+            "total_ms": round(self.total_seconds * 1000, 2),
+            "db_queries": self.db_queries,
+            "db_ms": round(self.db_seconds * 1000, 2),
+            "serializer_ms": round(self.spans.get("serializer", 0.0) * 1000, 2),
+            "cache_hits": self.counters.get("cache_hit", 0),
+            "cache_misses": self.counters.get("cache_miss", 0),
+        }
+
+
+_current: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+def start_request():
+    return _current.set(RequestStats())
+
+
+def end_request(token) -> None:
+    _current.reset(token)
+
+
+def current() -> RequestStats | None:
+    return _current.get()
+
+
+def count(name: str, n: int = 1) -> None:
+    stats = _current.get()
+    if stats is not None:
+        stats.counters[name] = stats.counters.get(name, 0) + n
+
+
+@contextmanager
+def span(name: str):
+    """Суммирует время в stats.spans[name]; вложенные span с тем же именем не считаются дважды."""
+    stats = _current.get()
+    if stats is None or stats._depth.get(name):
+        yield
+        return
+    stats._depth[name] = 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats._depth[name] = 0
+        stats.spans[name] = stats.spans.get(name, 0.0) + time.perf_counter() - started
+
+
+def record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db_queries += 1
+        stats.db_seconds += time.perf_counter() - started
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class TimedSerializerMixin:
+    def to_representation(self, instance):
+        with span("serializer"):
+            return super().to_representation(instance)
+
+    def run_validation(self, data=empty):
+        with span("serializer"):
+            return super().run_validation(data)
+
+
+def view_name(request) -> str:
+    """MerchListAPIView, DocumentViewSet.download, admin:core_product_changelist, ..."""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "-"
+    func = match.func
+    cls = getattr(func, "cls", None) or getattr(func, "view_class", None)
+    if cls is None:
+        return match.view_name or match._func_path
+    actions = getattr(func, "actions", None)
+    if actions:
+        action = actions.get(request.method.lower())
+        if action:
+            return f"{cls.__name__}.{action}"
+    return cls.__name__
+
+
+def server_timing(stats: RequestStats) -> str:
+    data = stats.as_dict()
+    parts = [
+        f'total;dur={data["total_ms"]}',
+        f'db;dur={data["db_ms"]};desc="{data["db_queries"]} queries"',
+        f'serializer;dur={data["serializer_ms"]}',
+    ]
+    if data["cache_hits"] or data["cache_misses"]:
+        parts.append(f'cache;desc="{data["cache_hits"]} hit, {data["cache_misses"]} miss"')
+    return ", ".join(parts)
@@ -0,0 +1,89 @@
+# core/routers.py
+"""
+Роутер БД: безопасные (GET/HEAD/OPTIONS) запросы к публичному API читают с реплик,
+всё остальное — с primary ("default").
+
+Состояние запроса (можно ли читать с реплики, была ли уже запись, какая реплика выбрана)
+хранит ReplicaRoutingMiddleware в contextvar. Если в запросе была запись, дальнейшие
+чтения идут в primary (read-after-write). Запись замечаем и в db_for_write, и по самому SQL
+(execute_wrapper на соединениях primary) — .using("default") мимо роутера тоже считается.
+migrate на реплики не ходит (allow_migrate). Вне HTTP-запросов (команды, воркер) роутер
+ничего не решает — всё идёт в default.
+"""
+from __future__ import annotations
+
+import random
+import re
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+# пользователи, сессии и content types читаем только с primary: после логина/смены пароля
+# отстающая реплика вернула бы старую сессию или пароль, а ContentType кэшируется по id
+PRIMARY_ONLY_APPS = {"auth", "sessions", "contenttypes"}
+
+_WRITE_SQL_RE = re.compile(r"^\s*(INSERT|UPDATE|DELETE|REPLACE)\b", re.IGNORECASE)
+
+_request_state: ContextVar[dict | None] = ContextVar("db_request_state", default=None)
+
+
+def replica_aliases() -> list[str]:
+    return list(getattr(settings, "DATABASE_REPLICAS", []))
+
+
+def begin_request(replica_ok: bool):
+    return _request_state.set({"replica_ok": replica_ok, "wrote": False, "alias": None})
+
+
+def end_request(token) -> None:
+    _request_state.reset(token)
+
+
+def record_write(execute, sql, params, many, context):
+    state = _request_state.get()
+    if state is not None and not state["wrote"] and _WRITE_SQL_RE.match(sql):
+        state["wrote"] = True
+    return execute(sql, params, many, context)
+
+
+@receiver(connection_created)
+def install_write_recorder(sender, connection, **kwargs):
+    if connection.alias in replica_aliases():
+        return
+    if record_write not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_write)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _request_state.get()
+        if state is None:
+            return None
+        if not state["replica_ok"] or state["wrote"] or model._meta.app_label in PRIMARY_ONLY_APPS:
+            return "default"
+
+        replicas = replica_aliases()
+        if not replicas:
+            return None
+        if state["alias"] is None:
+            # одна реплика на весь запрос — ответ не смешивает разное отставание реплик
+            state["alias"] = random.choice(replicas)
+        return state["alias"]
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            state["wrote"] = True
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # primary и реплики — одна и та же база
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # схема реплик приходит с primary (репликация), сами реплики только для чтения
+        if db in replica_aliases():
+            return False
+        return None
@@ -0,0 +1,143 @@
+# core/search.py
+"""
+Полнотекстовый поиск по товарам (Product.name + Product.description).
+
+- SQLite: FTS5-таблица core_product_fts (rowid = Product.id), синхронизируется сигналами.
+- PostgreSQL: GIN-индекс по to_tsvector('russian', ...), поддерживается самой БД.
+- Остальные БД / FTS5 недоступен: фолбек на icontains.
+"""
+from __future__ import annotations
+
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q, QuerySet
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = "core_product_fts"
+
+# name важнее description
+FTS_WEIGHTS = (10.0, 1.0)
+
+PG_VECTOR_SQL = (
+    "setweight(to_tsvector('russian', coalesce(\"core_product\".\"name\", '')), 'A') || "
+    "setweight(to_tsvector('russian', coalesce(\"core_product\".\"description\", '')), 'B')"
+)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_RU_ENDINGS = set("аеиийоуыьэюя")
+
+_fts_available: dict[str, bool] = {}
+
+
+def normalize_text(value: str | None) -> str:
+    # unicode61 не склеивает «ё» и «е» — приводим сами и в индексе, и в запросе
+    return (value or "").lower().replace("ё", "е")
+
+
+def _stem(token: str) -> str:
+    # грубый «стемминг» для русского: отрезаем гласные окончания,
+    # дальше префиксный поиск ловит «футболка/футболки/футболку»
+    while len(token) > 4 and token[-1] in _RU_ENDINGS:
+        token = token[:-1]
+    return token
+
+
+def build_fts_query(search: str) -> str | None:
+    tokens = [_stem(t) for t in _TOKEN_RE.findall(normalize_text(search))]
+    tokens = [t.replace('"', "") for t in tokens if t]
+    if not tokens:
+        return None
+    return " ".join(f'"{t}"*' for t in tokens)
+
+
+def fts_available(using: str = "default") -> bool:
+    connection = connections[using]
+    if connection.vendor == "postgresql":
+        return True
+    if connection.vendor != "sqlite":
+        return False
+    if using not in _fts_available:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+            _fts_available[using] = cursor.fetchone() is not None
+    return _fts_available[using]
+
+
+def search_products(qs: QuerySet, search: str) -> QuerySet:
+    """
+    Фильтрует qs по поисковой строке и аннотирует search_rank (больше — релевантнее).
+    """
+    using = qs.db
+    vendor = connections[using].vendor
+
+    if fts_available(using):
+        if vendor == "postgresql":
+            return (
+                qs.filter(
+                    RawSQL(
+                        f"({PG_VECTOR_SQL}) @@ websearch_to_tsquery('russian', %s)",
+                        (search,),
+                        output_field=BooleanField(),
+                    )
+                )
+                .annotate(
+                    search_rank=RawSQL(
+                        f"ts_rank({PG_VECTOR_SQL}, websearch_to_tsquery('russian', %s))",
+                        (search,),
+                        output_field=FloatField(),
+                    )
+                )
+            )
+
+        match = build_fts_query(search)
+        if match:
+            name_w, desc_w = FTS_WEIGHTS
+            return (
+                qs.filter(
+                    id__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", (match,))
+                )
+                .annotate(
+                    search_rank=RawSQL(
+                        f"SELECT -bm25({FTS_TABLE}, {name_w}, {desc_w}) FROM {FTS_TABLE} "
+                        f"WHERE {FTS_TABLE} MATCH %s AND rowid = \"core_product\".\"id\"",
+                        (match,),
+                        output_field=FloatField(),
+                    )
+                )
+            )
+
+    return qs.filter(Q(name__icontains=search) | Q(description__icontains=search))
+
+
+def index_product(product, using: str = "default") -> None:
+    if not fts_available(using) or connections[using].vendor != "sqlite":
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [product.pk])
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} (rowid, name, description) VALUES (%s, %s, %s)",
+            [product.pk, normalize_text(product.name), normalize_text(product.description)],
+        )
+
+
+def unindex_product(product_id: int, using: str = "default") -> None:
+    if not fts_available(using) or connections[using].vendor != "sqlite":
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [product_id])
+
+
+def rebuild_search_index(using: str = "default") -> int:
+    """Полная пересборка FTS5-индекса (для SQLite). Возвращает число товаров в индексе."""
+    connection = connections[using]
+    if connection.vendor != "sqlite" or not fts_available(using):
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        cursor.execute("SELECT id, name, description FROM core_product")
+        rows = [(pk, normalize_text(n), normalize_text(d)) for pk, n, d in cursor.fetchall()]
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} (rowid, name, description) VALUES (%s, %s, %s)", rows
+        )
+    return len(rows)
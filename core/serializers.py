@@ -12,6 +12,8 @@ from rest_framework import serializers
 from django.core.validators import FileExtensionValidator
 
 from .exceptions import ApiError
+from .perf import TimedSerializerMixin
+from .notifications import record_order_created
 
 from .models import (
     Teacher,
@@ -25,11 +27,21 @@ from .models import (
     OrderItem,
 )
 
+
+# базовые классы core: время сериализаторов попадает в метрики запроса (core/perf.py)
+class ModelSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    pass
+
+
+class Serializer(TimedSerializerMixin, serializers.Serializer):
+    pass
+
+
 # =========================
 # School serializers
 # =========================
 
-class TeacherSerializer(serializers.ModelSerializer):
+class TeacherSerializer(ModelSerializer):
     photo_url = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
@@ -44,7 +56,7 @@ class TeacherSerializer(serializers.ModelSerializer):
         return obj.photo.url if obj.photo else None
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(ModelSerializer):
     class Meta:
         model = Review
         fields = ("id", "name", "text", "rating", "created_at")
@@ -68,14 +80,14 @@ class ReviewSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class SchoolInfoSerializer(serializers.ModelSerializer):
+class SchoolInfoSerializer(ModelSerializer):
     class Meta:
         model = SchoolInfo
         fields = ("id", "address", "email", "phone", "about", "map_iframe")
         read_only_fields = ("id",)
 
 
-class DocumentSerializer(serializers.ModelSerializer):
+class DocumentSerializer(ModelSerializer):
     download_url = serializers.SerializerMethodField(read_only=True)
     file_url = serializers.SerializerMethodField(read_only=True)
     audience_label = serializers.SerializerMethodField(read_only=True)
@@ -125,7 +137,7 @@ def validate_image_size(file):
         raise serializers.ValidationError(f"Слишком большой файл (> {MAX_IMAGE_SIZE_MB} MB).")
 
 
-class ProductImageNestedSerializer(serializers.ModelSerializer):
+class ProductImageNestedSerializer(ModelSerializer):
     image_url = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
@@ -140,7 +152,7 @@ class ProductImageNestedSerializer(serializers.ModelSerializer):
         return obj.image.url if obj.image else None
 
 
-class ProductImageSerializer(serializers.ModelSerializer):
+class ProductImageSerializer(ModelSerializer):
     image_url = serializers.SerializerMethodField(read_only=True)
     image = serializers.ImageField(
         validators=[
@@ -161,7 +173,7 @@ class ProductImageSerializer(serializers.ModelSerializer):
         return obj.image.url if obj.image else None
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(ModelSerializer):
     images = ProductImageNestedSerializer(many=True, read_only=True)
 
     upload_images = serializers.ListField(
@@ -255,6 +267,13 @@ class ProductSerializer(serializers.ModelSerializer):
         for i, file in enumerate(files):
             ProductImage.objects.create(product=product, image=file, order=i)
 
+    def _refresh_fragment(self, product: Product, ordered_ids: list[int]):
+        # перестановка фото идёт через update() без сигналов — пересобираем фрагмент API v1 сами
+        if ordered_ids:
+            from .fragments import refresh_fragments
+
+            refresh_fragments([product.pk])
+
     @transaction.atomic
     def create(self, validated_data):
         upload_images = validated_data.pop("upload_images", [])
@@ -270,6 +289,7 @@ class ProductSerializer(serializers.ModelSerializer):
 
         self._apply_delete(product, delete_ids)
         self._apply_reorder(product, order_ids)
+        self._refresh_fragment(product, order_ids)
         return product
 
     @transaction.atomic
@@ -291,6 +311,7 @@ class ProductSerializer(serializers.ModelSerializer):
                 self._append_images(product, upload_images)
 
         self._apply_reorder(product, order_ids)
+        self._refresh_fragment(product, order_ids)
         return product
 
 
@@ -298,7 +319,7 @@ class ProductSerializer(serializers.ModelSerializer):
 # API v1 (public) - Merch & Orders
 # =========================
 
-class MerchItemSerializer(serializers.ModelSerializer):
+class MerchItemSerializer(ModelSerializer):
     # id в API v1 должен быть UUID строкой -> берём из Product.uuid
     id = serializers.UUIDField(source="uuid", read_only=True)
 
@@ -328,36 +349,133 @@ class MerchItemSerializer(serializers.ModelSerializer):
         )
 
     def _abs(self, url: str | None):
+        # url_prefix — плейсхолдер хоста для предрассчитанных фрагментов (core/fragments.py)
+        prefix = self.context.get("url_prefix")
+        if prefix is not None and url and url.startswith("/"):
+            return prefix + url
         request = self.context.get("request")
         return request.build_absolute_uri(url) if request and url else url
 
+    def _images(self, obj) -> list[ProductImage]:
+        # images.all() читает из prefetch-кэша (Prefetch уже отсортирован по order, id);
+        # .order_by()/.first() здесь давали бы отдельный запрос на каждый товар
+        return [i for i in obj.images.all() if i.image]
+
     def get_image(self, obj) -> str | None:
-        first = obj.images.order_by("order", "id").first()
-        return self._abs(first.image.url) if first and first.image else None
+        images = self._images(obj)
+        return self._abs(images[0].image.url) if images else None
 
     def get_images(self, obj) -> list[str]:
-        return [self._abs(i.image.url) for i in obj.images.order_by("order", "id") if i.image]
+        return [self._abs(i.image.url) for i in self._images(obj)]
 
     def get_category(self, obj) -> str | None:
         return obj.category.name if obj.category_id else None
 
 
-class MerchCategorySerializer(serializers.ModelSerializer):
-    count = serializers.IntegerField(read_only=True)
+class MerchCategorySerializer(ModelSerializer):
+    count = serializers.IntegerField(source="products_count", read_only=True)
+    inStockCount = serializers.IntegerField(source="in_stock_count", read_only=True)
 
     class Meta:
         model = MerchCategory
-        fields = ("id", "name", "slug", "count")
+        fields = ("id", "name", "slug", "count", "inStockCount")
 
 
-class OrderItemInSerializer(serializers.Serializer):
+class OrderItemInSerializer(Serializer):
     itemId = serializers.UUIDField()
     quantity = serializers.IntegerField(min_value=1, max_value=99)
     selectedSize = serializers.CharField(required=False, allow_null=True, allow_blank=True)
     selectedColor = serializers.CharField(required=False, allow_null=True, allow_blank=True)
 
 
-class CreateOrderSerializer(serializers.Serializer):
+def _line_error(code: str, message: str, field: str, status_code: int = 400) -> ApiError:
+    return ApiError(
+        code=code,
+        message=message,
+        status_code=status_code,
+        details={"field": field, "message": message},
+    )
+
+
+def validate_order_items(items_in: list[dict]):
+    """
+    Общая проверка позиций для заказа и для /api/v1/cart/quote (только чтение).
+
+    Возвращает (prepared, errors, calc_total):
+    - prepared: [(product, qty, size, color)] для валидных позиций;
+    - errors: ApiError по одной на каждую невалидную позицию (в порядке позиций);
+    - calc_total: сумма по валидным позициям.
+    """
+    ids = [i["itemId"] for i in items_in]
+    by_uuid = {p.uuid: p for p in Product.objects.filter(uuid__in=ids)}
+
+    calc_total = Decimal("0.00")
+    prepared: list[tuple[Product, int, str | None, str | None]] = []
+    errors: list[ApiError] = []
+
+    for idx, it in enumerate(items_in):
+        p = by_uuid.get(it["itemId"])
+        if not p:
+            errors.append(_line_error("ITEM_NOT_FOUND", "Товар не найден", f"items[{idx}].itemId", 404))
+            continue
+
+        if not p.in_stock:
+            errors.append(_line_error("ITEM_OUT_OF_STOCK", "Товар отсутствует в наличии", f"items[{idx}].itemId"))
+            continue
+
+        qty = it["quantity"]
+        if not (1 <= qty <= 99):
+            errors.append(_line_error("INVALID_QUANTITY", "Неверное количество", f"items[{idx}].quantity"))
+            continue
+
+        sel_size = (it.get("selectedSize") or None)
+        sel_color = (it.get("selectedColor") or None)
+
+        # sizes/colors: если в продукте указаны варианты — выбранное значение обязательно
+        if p.sizes and (not sel_size or sel_size not in p.sizes):
+            errors.append(_line_error("INVALID_SIZE", "Неверный размер товара", f"items[{idx}].selectedSize"))
+            continue
+
+        if p.colors and (not sel_color or sel_color not in p.colors):
+            errors.append(_line_error("INVALID_COLOR", "Неверный цвет товара", f"items[{idx}].selectedColor"))
+            continue
+
+        calc_total += (p.price * qty)
+        prepared.append((p, qty, sel_size, sel_color))
+
+    return prepared, errors, calc_total
+
+
+class CartQuoteSerializer(Serializer):
+    items = OrderItemInSerializer(many=True, allow_empty=False)
+    total = serializers.DecimalField(max_digits=12, decimal_places=2, coerce_to_string=False, required=False)
+
+    def quote(self) -> dict:
+        prepared, errors, calc_total = validate_order_items(self.validated_data["items"])
+        data = {
+            "total": str(calc_total),
+            "lines": [
+                {
+                    "itemId": str(p.uuid),
+                    "name": p.name,
+                    "quantity": qty,
+                    "price": str(p.price),
+                    "lineTotal": str(p.price * qty),
+                    "selectedSize": sel_size,
+                    "selectedColor": sel_color,
+                }
+                for p, qty, sel_size, sel_color in prepared
+            ],
+            "errors": [e.to_payload() for e in errors],
+            "valid": not errors,
+        }
+        if "total" in self.validated_data:
+            data["totalMatches"] = not errors and calc_total == self.validated_data["total"]
+            data["valid"] = data["valid"] and data["totalMatches"]
+        return data
+
+
+class CreateOrderSerializer(Serializer):
     parentName = serializers.CharField(min_length=2, max_length=200)
     childrenNames = serializers.CharField(min_length=2, max_length=500)
     phone = serializers.CharField()
@@ -373,73 +491,10 @@ class CreateOrderSerializer(serializers.Serializer):
 
     @transaction.atomic
     def create(self, validated):
-        # 1) поднимем товары по uuid
-        items_in = validated["items"]
-        ids = [i["itemId"] for i in items_in]
-
-        products = (
-            Product.objects
-            .select_related("category")
-            .prefetch_related("images")
-            .filter(uuid__in=ids)
-        )
-        by_uuid = {p.uuid: p for p in products}
-
-        # 2) валидации + расчет суммы
-        calc_total = Decimal("0.00")
-        prepared: list[tuple[Product, int, str | None, str | None]] = []
-
-        for idx, it in enumerate(items_in):
-            p = by_uuid.get(it["itemId"])
-            if not p:
-                raise ApiError(
-                    code="ITEM_NOT_FOUND",
-                    message="Товар не найден",
-                    status_code=404,
-                    details={"field": f"items[{idx}].itemId", "message": "Товар не найден"},
-                )
-
-            if not p.in_stock:
-                raise ApiError(
-                    code="ITEM_OUT_OF_STOCK",
-                    message="Товар отсутствует в наличии",
-                    status_code=400,
-                    details={"field": f"items[{idx}].itemId", "message": "Товар отсутствует в наличии"},
-                )
-
-            qty = it["quantity"]
-            if not (1 <= qty <= 99):
-                raise ApiError(
-                    code="INVALID_QUANTITY",
-                    message="Неверное количество",
-                    status_code=400,
-                    details={"field": f"items[{idx}].quantity", "message": "Неверное количество"},
-                )
-
-            sel_size = (it.get("selectedSize") or None)
-            sel_color = (it.get("selectedColor") or None)
-
-            # sizes/colors: если в продукте указаны варианты — выбранное значение обязательно
-            if p.sizes:
-                if not sel_size or sel_size not in p.sizes:
-                    raise ApiError(
-                        code="INVALID_SIZE",
-                        message="Неверный размер товара",
-                        status_code=400,
-                        details={"field": f"items[{idx}].selectedSize", "message": "Неверный размер товара"},
-                    )
-
-            if p.colors:
-                if not sel_color or sel_color not in p.colors:
-                    raise ApiError(
-                        code="INVALID_COLOR",
-                        message="Неверный цвет товара",
-                        status_code=400,
-                        details={"field": f"items[{idx}].selectedColor", "message": "Неверный цвет товара"},
-                    )
-
-            calc_total += (p.price * qty)
-            prepared.append((p, qty, sel_size, sel_color))
+        # 1-2) товары по uuid, валидации + расчет суммы (общий код с /cart/quote)
+        prepared, errors, calc_total = validate_order_items(validated["items"])
+        if errors:
+            raise errors[0]
 
         # 3) total mismatch
         if calc_total != validated["total"]:
@@ -459,21 +514,28 @@ class CreateOrderSerializer(serializers.Serializer):
             comment=(validated.get("comment") or None),
         )
 
-        # 5) позиции заказа со snapshot-данными
-        for p, qty, sel_size, sel_color in prepared:
-            OrderItem.objects.create(
-                order=order,
-                product=p,
-                quantity=qty,
-                selected_size=sel_size,
-                selected_color=sel_color,
-                price_at_order=p.price,
-                name_at_order=p.name,
-            )
+        # 5) позиции заказа со snapshot-данными — одним INSERT
+        OrderItem.objects.bulk_create(
+            [
+                OrderItem(
+                    order=order,
+                    product=p,
+                    quantity=qty,
+                    selected_size=sel_size,
+                    selected_color=sel_color,
+                    price_at_order=p.price,
+                    name_at_order=p.name,
+                )
+                for p, qty, sel_size, sel_color in prepared
+            ]
+        )
+
+        # 6) outbox уведомлений — в этой же транзакции, доставка фоном
+        record_order_created(order, prepared)
 
         return order
 
-class OrderCreatedOutSerializer(serializers.Serializer):
+class OrderCreatedOutSerializer(Serializer):
     orderId = serializers.UUIDField(source="uuid")
     orderNumber = serializers.CharField(source="order_number")
     message = serializers.CharField()
\ No newline at end of file
@@ -1,13 +1,19 @@
 # app/signals.py
-from django.db.models.signals import post_delete, pre_save
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
-from .models import ProductImage
+from .catalog_cache import bump_catalog_version
+from .facets import apply_facet_change, product_facet_state
+from .fragments import refresh_fragments
+from .jobs import enqueue
+from .models import MerchCategory, Product, ProductImage
+from .search import index_product, unindex_product
 
 @receiver(post_delete, sender=ProductImage)
 def product_image_delete_file(sender, instance: ProductImage, **kwargs):
-    # Удаляем файл после удаления записи
+    # Удаляем файл после удаления записи (в фоне, через очередь задач): без запущенного
+    # run_worker (или cron с `run_worker --once`) файлы не удаляются, задачи копятся в core.Job
     if instance.image:
-        instance.image.delete(save=False)
+        enqueue("core.delete_storage_file", {"name": instance.image.name})
 
 @receiver(pre_save, sender=ProductImage)
 def product_image_replace_file(sender, instance: ProductImage, **kwargs):
@@ -20,4 +26,63 @@ def product_image_replace_file(sender, instance: ProductImage, **kwargs):
         return
 
     if old.image and old.image != instance.image:
-        old.image.delete(save=False)
\ No newline at end of file
+        enqueue("core.delete_storage_file", {"name": old.image.name})
+
+@receiver(post_save, sender=Product)
+def product_search_index_update(sender, instance: Product, using, **kwargs):
+    # держим полнотекстовый индекс в актуальном состоянии
+    index_product(instance, using=using)
+
+@receiver(post_delete, sender=Product)
+def product_search_index_delete(sender, instance: Product, using, **kwargs):
+    unindex_product(instance.pk, using=using)
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=ProductImage)
+@receiver([post_save, post_delete], sender=MerchCategory)
+def catalog_changed(sender, using, **kwargs):
+    # инвалидируем кэш ответов API v1 merch (и сдвигаем Last-Modified — в т.ч. при удалении)
+    bump_catalog_version(using=using)
+
+@receiver(pre_save, sender=Product)
+def product_facets_remember(sender, instance: Product, using, **kwargs):
+    instance._facet_old = product_facet_state(instance.pk, using=using) if instance.pk else None
+
+@receiver(post_save, sender=Product)
+def product_facets_update(sender, instance: Product, using, update_fields=None, **kwargs):
+    old = getattr(instance, "_facet_old", None)
+    category_id, in_stock = instance.category_id, instance.in_stock
+    if update_fields is not None and old is not None:
+        # поля, которые не сохранялись, в БД остались прежними
+        if "category" not in update_fields and "category_id" not in update_fields:
+            category_id = old[0]
+        if "in_stock" not in update_fields:
+            in_stock = old[1]
+    apply_facet_change(old, (category_id, in_stock), using=using)
+
+@receiver(post_delete, sender=Product)
+def product_facets_delete(sender, instance: Product, using, **kwargs):
+    apply_facet_change((instance.category_id, instance.in_stock), None, using=using)
+
+@receiver(post_save, sender=Product)
+def product_fragment_update(sender, instance: Product, using, **kwargs):
+    # refresh_fragments пишет api_fragment через update(), так что сигналы не зацикливаются
+    refresh_fragments([instance.pk], using=using)
+
+@receiver([post_save, post_delete], sender=ProductImage)
+def product_image_fragment_update(sender, instance: ProductImage, using, **kwargs):
+    refresh_fragments([instance.product_id], using=using)
+
+@receiver(post_save, sender=MerchCategory)
+def category_fragment_update(sender, instance: MerchCategory, using, created=False, **kwargs):
+    if not created:
+        refresh_fragments(instance.products.values_list("pk", flat=True), using=using)
+
+@receiver(pre_delete, sender=MerchCategory)
+def category_fragment_remember(sender, instance: MerchCategory, using, **kwargs):
+    instance._fragment_product_ids = list(instance.products.values_list("pk", flat=True))
+
+@receiver(post_delete, sender=MerchCategory)
+def category_fragment_delete(sender, instance: MerchCategory, using, **kwargs):
+    # товары уже переведены в category=NULL (SET_NULL) без сигналов
+    refresh_fragments(getattr(instance, "_fragment_product_ids", []), using=using)
@@ -0,0 +1,13 @@
+# core/tasks.py
+"""Фоновые задачи приложения (регистрируются при импорте в CoreConfig.ready)."""
+from django.core.files.storage import default_storage
+
+from .jobs import task
+from .notifications import dispatch_order_notifications  # noqa: F401 (регистрация задачи)
+
+
+@task("core.delete_storage_file")
+def delete_storage_file(payload: dict):
+    name = payload.get("name")
+    if name and default_storage.exists(name):
+        default_storage.delete(name)
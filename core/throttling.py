@@ -0,0 +1,173 @@
+# core/throttling.py
+"""
+Троттлинг со скользящим окном поверх общего для всех процессов хранилища счётчиков.
+
+SimpleRateThrottle из DRF хранит список всех отметок времени клиента и переписывает его
+на каждый запрос, а кэш по умолчанию (LocMem) свой у каждого процесса — при N воркерах
+клиент получает N× лимит. Здесь на клиента два счётчика фиксированных окон
+(текущее и предыдущее), оценка запросов за последние duration секунд:
+
+    prev * (1 - доля прошедшего текущего окна) + curr
+
+Одно чтение и одно атомарное увеличение на запрос. Хранилище (get_store):
+- THROTTLE_CACHE_ALIAS задан — кэш Django с атомарным incr, не сбрасывающим TTL (Redis);
+- иначе — SQLite-файл settings.THROTTLE_DB_PATH (как у core/metrics.py): счётчик
+  увеличивается одним UPSERT, срок жизни окна задаётся при создании и не продлевается.
+Обобщённый BaseCache.incr (get + set) не годится: он не атомарен и сбрасывает TTL
+на таймаут по умолчанию, т.е. «10/day» превращается в «10 за 5 минут простоя».
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import AnonRateThrottle, ScopedRateThrottle, SimpleRateThrottle
+
+from . import metrics
+
+PURGE_INTERVAL = 60.0
+
+
+class CacheCounterStore:
+    """Счётчики в кэше Django; только для бэкендов с атомарным incr, сохраняющим TTL (Redis)."""
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def get_many(self, keys: list[str], now: float) -> dict[str, int]:
+        return self.cache.get_many(keys)
+
+    def incr(self, key: str, timeout: float, now: float) -> None:
+        if not self.cache.add(key, 1, timeout=timeout):
+            try:
+                self.cache.incr(key)
+            except ValueError:  # ключ истёк между add и incr
+                self.cache.set(key, 1, timeout=timeout)
+
+    def clear(self) -> None:
+        self.cache.clear()
+
+
+class SqliteCounterStore:
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS throttle_counter "
+        "(key TEXT PRIMARY KEY, n INTEGER NOT NULL, expires REAL NOT NULL)",
+        "CREATE INDEX IF NOT EXISTS idx_throttle_counter_expires ON throttle_counter (expires)",
+    )
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._last_purge = 0.0
+        os.register_at_fork(after_in_child=self._after_fork_in_child)
+
+    def _after_fork_in_child(self) -> None:
+        # соединение SQLite нельзя использовать в двух процессах
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            for statement in self.SCHEMA:
+                conn.execute(statement)
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, keys: list[str], now: float) -> dict[str, int]:
+        placeholders = ", ".join("?" * len(keys))
+        with self._lock:
+            rows = self._connection().execute(
+                f"SELECT key, n FROM throttle_counter WHERE key IN ({placeholders}) AND expires > ?",
+                [*keys, now],
+            ).fetchall()
+        return dict(rows)
+
+    def incr(self, key: str, timeout: float, now: float) -> None:
+        with self._lock:
+            conn = self._connection()
+            # истёкший ключ начинается заново, живой — только n + 1, срок не трогаем
+            conn.execute(
+                "INSERT INTO throttle_counter (key, n, expires) VALUES (?, 1, ?) "
+                "ON CONFLICT (key) DO UPDATE SET "
+                "n = CASE WHEN expires > ? THEN n + 1 ELSE 1 END, "
+                "expires = CASE WHEN expires > ? THEN expires ELSE excluded.expires END",
+                [key, now + timeout, now, now],
+            )
+            if now - self._last_purge >= PURGE_INTERVAL:
+                self._last_purge = now
+                conn.execute("DELETE FROM throttle_counter WHERE expires <= ?", [now])
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connection().execute("DELETE FROM throttle_counter")
+
+
+_sqlite_stores: dict[str, SqliteCounterStore] = {}
+
+
+def get_store():
+    alias = getattr(settings, "THROTTLE_CACHE_ALIAS", None)
+    if alias:
+        return CacheCounterStore(caches[alias])
+    path = str(getattr(settings, "THROTTLE_DB_PATH", Path(settings.BASE_DIR) / "var" / "throttle.sqlite3"))
+    if path not in _sqlite_stores:
+        _sqlite_stores[path] = SqliteCounterStore(path)
+    return _sqlite_stores[path]
+
+
+class SlidingWindowRateThrottle(SimpleRateThrottle):
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        window = int(self.now // self.duration)
+        current_key = f"{self.key}:{window}"
+        previous_key = f"{self.key}:{window - 1}"
+
+        store = get_store()
+        counts = store.get_many([current_key, previous_key], self.now)
+        self.current = counts.get(current_key, 0)
+        self.previous = counts.get(previous_key, 0)
+        self.elapsed = (self.now % self.duration) / self.duration
+
+        if self.previous * (1 - self.elapsed) + self.current >= self.num_requests:
+            metrics.inc("throttle_rejections_total", scope=self.scope)
+            return self.throttle_failure()
+
+        # окно живёт 2*duration: ещё одно окно оно нужно как «предыдущее»
+        store.incr(current_key, 2 * self.duration, self.now)
+        return True
+
+    def wait(self):
+        remaining = 1 - self.elapsed
+        if self.current < self.num_requests:
+            # ждём, пока вес предыдущего окна упадёт настолько, что оценка станет < лимита
+            needed = 1 - (self.num_requests - self.current) / self.previous
+            return max(0.0, needed - self.elapsed) * self.duration
+        # текущее окно уже заполнено: в следующем оно станет «предыдущим»
+        needed = max(0.0, 1 - self.num_requests / self.current)
+        return (remaining + needed) * self.duration
+
+
+# ScopedRateThrottle.allow_request выставляет scope/rate из view и зовёт super() —
+# поэтому SlidingWindowRateThrottle стоит в MRO после него
+class ScopedSlidingWindowThrottle(ScopedRateThrottle, SlidingWindowRateThrottle):
+    pass
+
+
+class AnonSlidingWindowThrottle(AnonRateThrottle, SlidingWindowRateThrottle):
+    pass
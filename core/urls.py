@@ -1,4 +1,5 @@
 # core/urls.py
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
@@ -14,8 +15,11 @@ from .views_api_v1 import (
     MerchListAPIView,
     MerchDetailAPIView,
     MerchCategoriesAPIView,
+    CartQuoteAPIView,
     OrdersCreateAPIView,
 )
+from .views_metrics import MetricsAPIView
+from .views_api_v1_async import AsyncMerchListView, AsyncMerchDetailView, AsyncMerchCategoriesView
 
 router = DefaultRouter()
 router.register(r"teachers", TeacherViewSet, basename="teacher")          # /api/teachers/
@@ -25,13 +29,21 @@ router.register(r"documents", DocumentViewSet, basename="document")      # /api/
 router.register(r"products", ProductViewSet, basename="product")         # /api/products/
 router.register(r"product-images", ProductImageViewSet, basename="product-image")  # /api/product-images/
 
+if settings.ASYNC_CATALOG_VIEWS:
+    merch_list, merch_detail, merch_categories = AsyncMerchListView, AsyncMerchDetailView, AsyncMerchCategoriesView
+else:
+    merch_list, merch_detail, merch_categories = MerchListAPIView, MerchDetailAPIView, MerchCategoriesAPIView
+
 urlpatterns = [
     # старые DRF роуты
     path("", include(router.urls)),
 
     # --- API v1 (ТЗ) ---
-    path("v1/merch", MerchListAPIView.as_view()),
-    path("v1/merch/<uuid:id>", MerchDetailAPIView.as_view()),
-    path("v1/merch/categories", MerchCategoriesAPIView.as_view()),
+    path("v1/merch", merch_list.as_view()),
+    path("v1/merch/<uuid:id>", merch_detail.as_view()),
+    path("v1/merch/categories", merch_categories.as_view()),
+    path("v1/cart/quote", CartQuoteAPIView.as_view()),
     path("v1/orders", OrdersCreateAPIView.as_view()),
+
+    path("metrics", MetricsAPIView.as_view()),
 ]
\ No newline at end of file
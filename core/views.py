@@ -1,16 +1,17 @@
 # core/views.py
 import os
 
-from django.http import FileResponse, Http404
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 
 from rest_framework import mixins, permissions, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.throttling import ScopedRateThrottle
 
+from . import downloads
 from .models import Teacher, Review, SchoolInfo, Document
 from .serializers import TeacherSerializer, ReviewSerializer, SchoolInfoSerializer, DocumentSerializer
+from .throttling import ScopedSlidingWindowThrottle
 
 
 class TeacherViewSet(
@@ -41,7 +42,7 @@ class ReviewViewSet(
     viewsets.GenericViewSet,
 ):
     serializer_class = ReviewSerializer
-    throttle_classes = [ScopedRateThrottle]
+    throttle_classes = [ScopedSlidingWindowThrottle]
     throttle_scope = "reviews"
 
     def get_queryset(self):
@@ -110,4 +111,6 @@ class DocumentViewSet(
             raise Http404("Файл не найден")
 
         filename = doc.original_name or os.path.basename(doc.file.name)
-        return FileResponse(doc.file.open("rb"), as_attachment=True, filename=filename)
\ No newline at end of file
+        return downloads.serve(
+            request, downloads.Download(doc.file, filename, size=doc.file_size, etag=doc.etag)
+        )
\ No newline at end of file
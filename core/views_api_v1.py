@@ -1,27 +1,42 @@
 # core/views_api_v1.py
 from __future__ import annotations
 
+import base64
+import binascii
+import json
 import logging
 import math
-
-from django.db.models import Q, Count
+import uuid
+from datetime import datetime
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from rest_framework import permissions, status
 from rest_framework.response import Response
-from rest_framework.throttling import ScopedRateThrottle
 from rest_framework.views import APIView
 
 from rest_framework.generics import GenericAPIView
 
+from . import catalog_cache, idempotency, metrics
 from .exceptions import ApiError
+from .fragments import dumps, fragments_for, with_host
+from .search import search_products
+from .throttling import ScopedSlidingWindowThrottle
 from .models import Product, MerchCategory
 from .serializers import (
     MerchItemSerializer,
     MerchCategorySerializer,
+    CartQuoteSerializer,
     CreateOrderSerializer,
 )
 
 logger = logging.getLogger("core.orders")
 
+BATCH_MAX_IDS = 100
+
 
 def ok(data, http_status=200, cache_seconds: int | None = None):
     resp = Response({"success": True, "data": data}, status=http_status)
@@ -30,6 +45,36 @@ def ok(data, http_status=200, cache_seconds: int | None = None):
     return resp
 
 
+def catalog_headers(response, etag: str, last_modified: int, cache_seconds: int):
+    # 304 несёт те же валидаторы, что и 200 (RFC 9110 §15.4.5)
+    response["Cache-Control"] = f"public, max-age={int(cache_seconds)}"
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    return response
+
+
+def catalog_ok(request, key: str, build, cache_seconds: int):
+    """
+    Ответ каталога с ETag/Last-Modified: на совпадающий If-None-Match / If-Modified-Since
+    отвечаем 304 до запуска ORM и сериализаторов, иначе отдаём payload из кэша или build().
+
+    build() возвращает готовый JSON поля "data" (строкой) или None, если ресурса нет.
+    """
+    etag = catalog_cache.etag_for(key)
+    last_modified = catalog_cache.get_last_modified(request)
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return catalog_headers(not_modified, etag, last_modified, cache_seconds)
+
+    data = catalog_cache.get_or_build(key, build)
+    if data is None:
+        raise ApiError(code="NOT_FOUND", message="Ресурс не найден", status_code=404)
+
+    resp = HttpResponse('{"success":true,"data":%s}' % data, content_type="application/json")
+    return catalog_headers(resp, etag, last_modified, cache_seconds)
+
+
 def parse_bool(v: str | None):
     if v is None:
         return None
@@ -49,134 +94,317 @@ def parse_int(v, default: int, min_v: int, max_v: int):
     return max(min_v, min(max_v, x))
 
 
+def encode_cursor(product: Product, direction: str) -> str:
+    # product может быть «урезанным» (.only) — нужны только created_at и uuid
+    raw = json.dumps(
+        {"c": product.created_at.isoformat(), "u": product.uuid.hex, "d": direction},
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> tuple[datetime, uuid.UUID, str]:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        data = json.loads(raw)
+        created_at = datetime.fromisoformat(data["c"])
+        pk_uuid = uuid.UUID(hex=data["u"])
+        direction = data["d"]
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        direction = None
+    if direction not in ("next", "prev"):
+        raise ApiError(
+            code="VALIDATION_ERROR",
+            message="Ошибка валидации данных",
+            status_code=400,
+            details={"field": "cursor", "message": "Некорректный курсор"},
+        )
+    return created_at, pk_uuid, direction
+
+
+def list_params(query) -> dict:
+    """Параметры GET /api/v1/merch (общие для sync- и async-вариантов)."""
+    in_stock = parse_bool(query.get("inStock"))
+    if query.get("inStock") is not None and in_stock is None:
+        raise ApiError(
+            code="VALIDATION_ERROR",
+            message="Ошибка валидации данных",
+            status_code=400,
+            details={"field": "inStock", "message": "Ожидается boolean (true/false)"},
+        )
+    return {
+        "category": query.get("category"),
+        "search": query.get("search"),
+        "in_stock": in_stock,
+        "page": parse_int(query.get("page"), default=1, min_v=1, max_v=10_000),
+        "limit": parse_int(query.get("limit"), default=20, min_v=1, max_v=100),
+        "cursor": query.get("cursor") if "cursor" in query else None,
+    }
+
+
+def list_cache_key(request, params: dict) -> str:
+    return catalog_cache.cache_key(
+        "list",
+        request,
+        category=params["category"],
+        search=params["search"],
+        inStock=params["in_stock"],
+        page=params["page"],
+        limit=params["limit"],
+        cursor=params["cursor"],
+    )
+
+
+def batch_ids(query) -> list[uuid.UUID]:
+    raw = [x.strip() for x in query.get("ids", "").split(",") if x.strip()]
+    try:
+        ids = list(dict.fromkeys(uuid.UUID(x) for x in raw))
+    except ValueError:
+        ids = None
+    if not ids or len(ids) > BATCH_MAX_IDS:
+        raise ApiError(
+            code="VALIDATION_ERROR",
+            message="Ошибка валидации данных",
+            status_code=400,
+            details={"field": "ids", "message": f"Ожидается от 1 до {BATCH_MAX_IDS} UUID через запятую"},
+        )
+    return ids
+
+
+def merch_queryset(category, search, in_stock):
+    # товары отдаём готовыми фрагментами (core/fragments.py) — сериализатор не запускается
+    qs = Product.objects.only("id", "uuid", "created_at", "api_fragment")
+
+    if category:
+        qs = qs.filter(category__name=category)
+
+    if search:
+        qs = search_products(qs, search)
+
+    if in_stock is not None:
+        qs = qs.filter(in_stock=in_stock)
+    return qs
+
+
+def nonempty_categories_qs():
+    return (
+        MerchCategory.objects.filter(products_count__gt=0)
+        .order_by("name")
+        .values_list("name", flat=True)
+    )
+
+
+def offset_ordered(qs):
+    if "search_rank" in qs.query.annotations:
+        return qs.order_by("-search_rank", "-created_at")
+    return qs.order_by("-created_at")
+
+
+def offset_pagination(total: int, page: int, limit: int) -> tuple[int, dict]:
+    """Возвращает (offset, pagination); page за пределами — последняя страница."""
+    total_pages = max(1, math.ceil(total / limit))
+    if page > total_pages:
+        page = total_pages
+    pagination = {
+        "page": page,
+        "limit": limit,
+        "total": total,
+        "totalPages": total_pages,
+    }
+    return (page - 1) * limit, pagination
+
+
+def cursor_queryset(qs, token: str | None):
+    """
+    Keyset-пагинация по (created_at, uuid): без COUNT и OFFSET,
+    каждая страница — seek по idx_product_created_uuid. Возвращает (qs, direction).
+    """
+    direction = "next"
+    if token:
+        created_at, pk_uuid, direction = decode_cursor(token)
+        if direction == "next":
+            # created_at <= c отдельным условием: по нему SQLite ищет в индексе диапазон,
+            # а OR из двух веток без него превращается в полный скан
+            qs = qs.filter(Q(created_at__lte=created_at) & (Q(created_at__lt=created_at) | Q(uuid__lt=pk_uuid)))
+        else:
+            qs = qs.filter(Q(created_at__gte=created_at) & (Q(created_at__gt=created_at) | Q(uuid__gt=pk_uuid)))
+
+    if direction == "next":
+        return qs.order_by("-created_at", "-uuid"), direction
+    return qs.order_by("created_at", "uuid"), direction
+
+
+def cursor_pagination(items: list, token: str | None, direction: str, limit: int):
+    """items — результат qs[: limit + 1]. Возвращает (items страницы, pagination)."""
+    has_more = len(items) > limit
+    items = items[:limit]
+    if direction == "prev":
+        items.reverse()
+
+    if direction == "next":
+        has_next, has_prev = has_more, bool(token)
+    else:
+        has_next, has_prev = True, has_more
+
+    pagination = {
+        "limit": limit,
+        "nextCursor": encode_cursor(items[-1], "next") if items and has_next else None,
+        "prevCursor": encode_cursor(items[0], "prev") if items and has_prev else None,
+    }
+    return items, pagination
+
+
+def list_body(request, fragments: list[str], pagination: dict, categories: list[str]) -> str:
+    data = '{"items":[%s],"pagination":%s,"categories":%s}' % (
+        ",".join(fragments),
+        dumps(pagination),
+        dumps(categories),
+    )
+    return with_host(data, request)
+
+
+def batch_body(request, ids: list[uuid.UUID], products) -> str:
+    """Порядок как во входном списке, ненайденные id — в "missing"."""
+    by_uuid = {p.uuid: p for p in products}
+    found = [by_uuid[i] for i in ids if i in by_uuid]
+    missing = [str(i) for i in ids if i not in by_uuid]
+    data = '{"items":[%s],"missing":%s}' % (",".join(fragments_for(found)), dumps(missing))
+    return with_host(data, request)
+
+
 class MerchListAPIView(GenericAPIView):
     permission_classes = [permissions.AllowAny]
-    throttle_classes = [ScopedRateThrottle]
+    throttle_classes = [ScopedSlidingWindowThrottle]
     throttle_scope = "v1_merch"
     serializer_class = MerchItemSerializer
 
     def get(self, request):
-        category = request.query_params.get("category")
-        search = request.query_params.get("search")
-        page = parse_int(request.query_params.get("page"), default=1, min_v=1, max_v=10_000)
-        limit = parse_int(request.query_params.get("limit"), default=20, min_v=1, max_v=100)
-
-        in_stock = parse_bool(request.query_params.get("inStock"))
-        if request.query_params.get("inStock") is not None and in_stock is None:
-            raise ApiError(
-                code="VALIDATION_ERROR",
-                message="Ошибка валидации данных",
-                status_code=400,
-                details={"field": "inStock", "message": "Ожидается boolean (true/false)"},
-            )
-
-        qs = (
-            Product.objects.all()
-            .select_related("category")
-            .prefetch_related("images")
-        )
+        if "ids" in request.query_params:
+            return self._get_batch(request)
 
-        if category:
-            qs = qs.filter(category__name=category)
+        params = list_params(request.query_params)
+        key = list_cache_key(request, params)
+        return catalog_ok(request, key, lambda: self._build(request, **params), cache_seconds=60)
 
-        if search:
-            qs = qs.filter(Q(name__icontains=search) | Q(description__icontains=search))
+    def _build(self, request, category, search, in_stock, page: int, limit: int, cursor: str | None):
+        qs = merch_queryset(category, search, in_stock)
 
-        if in_stock is not None:
-            qs = qs.filter(in_stock=in_stock)
+        if cursor is not None:
+            qs, direction = cursor_queryset(qs, cursor)
+            items, pagination = cursor_pagination(list(qs[: limit + 1]), cursor, direction, limit)
+        else:
+            qs = offset_ordered(qs)
+            offset, pagination = offset_pagination(qs.count(), page, limit)
+            items = list(qs[offset : offset + limit])
 
-        qs = qs.order_by("-created_at")
+        categories = list(nonempty_categories_qs())
+        return list_body(request, fragments_for(items), pagination, categories)
 
-        total = qs.count()
-        total_pages = max(1, math.ceil(total / limit))
-        if page > total_pages:
-            page = total_pages
+    def _get_batch(self, request):
+        """
+        GET /api/v1/merch?ids=<uuid>,<uuid>... — пачка товаров для корзины одним запросом.
+        """
+        ids = batch_ids(request.query_params)
+        key = catalog_cache.cache_key("batch", request, ids=[i.hex for i in ids])
+        return catalog_ok(request, key, lambda: self._build_batch(request, ids), cache_seconds=60)
 
-        offset = (page - 1) * limit
-        items = qs[offset : offset + limit]
-
-        serializer = MerchItemSerializer(items, many=True, context={"request": request})
-
-        categories = list(
-            Product.objects.exclude(category__isnull=True)
-            .values_list("category__name", flat=True)
-            .distinct()
-            .order_by("category__name")
-        )
-
-        data = {
-            "items": serializer.data,
-            "pagination": {
-                "page": page,
-                "limit": limit,
-                "total": total,
-                "totalPages": total_pages,
-            },
-            "categories": categories,
-        }
-        return ok(data, cache_seconds=60)
+    def _build_batch(self, request, ids: list[uuid.UUID]):
+        return batch_body(request, ids, Product.objects.only("id", "uuid", "api_fragment").filter(uuid__in=ids))
 
 
 class MerchDetailAPIView(GenericAPIView):
     permission_classes = [permissions.AllowAny]
-    throttle_classes = [ScopedRateThrottle]
+    throttle_classes = [ScopedSlidingWindowThrottle]
     throttle_scope = "v1_merch"
     serializer_class = MerchItemSerializer
 
     def get(self, request, id):
-        product = (
-            Product.objects.select_related("category")
-            .prefetch_related("images")
-            .filter(uuid=id)
-            .first()
-        )
-        if not product:
-            raise ApiError(code="NOT_FOUND", message="Ресурс не найден", status_code=404)
+        key = catalog_cache.cache_key("detail", request, id=id)
+        return catalog_ok(request, key, lambda: self._build(request, id), cache_seconds=60)
 
-        serializer = MerchItemSerializer(product, context={"request": request})
-        return ok(serializer.data, cache_seconds=60)
+    def _build(self, request, id):
+        product = Product.objects.only("id", "api_fragment").filter(uuid=id).first()
+        if not product:
+            return None
+        return with_host(fragments_for([product])[0], request)
 
 
 class MerchCategoriesAPIView(GenericAPIView):
     permission_classes = [permissions.AllowAny]
-    throttle_classes = [ScopedRateThrottle]
+    throttle_classes = [ScopedSlidingWindowThrottle]
     throttle_scope = "v1_merch"
     serializer_class = MerchCategorySerializer
 
     def get(self, request):
-        qs = (
-            MerchCategory.objects.annotate(count=Count("products"))
-            .order_by("name")
-        )
-        serializer = MerchCategorySerializer(qs, many=True)
-        return ok(serializer.data, cache_seconds=300)
+        key = catalog_cache.cache_key("categories", request)
+        return catalog_ok(request, key, self._build, cache_seconds=300)
+
+    def _build(self):
+        qs = MerchCategory.objects.order_by("name")
+        return dumps(MerchCategorySerializer(qs, many=True).data)
+
+
+class CartQuoteAPIView(GenericAPIView):
+    """
+    POST /api/v1/cart/quote — та же проверка позиций и расчёт суммы, что и при создании заказа,
+    но только на чтение: без транзакции, без записи заказа и без слота v1_orders.
+    """
+    permission_classes = [permissions.AllowAny]
+    throttle_classes = [ScopedSlidingWindowThrottle]
+    throttle_scope = "v1_cart"
+    serializer_class = CartQuoteSerializer
+
+    def post(self, request):
+        s = CartQuoteSerializer(data=request.data, context={"request": request})
+        s.is_valid(raise_exception=True)
+        return ok(s.quote())
 
 
 class OrdersCreateAPIView(GenericAPIView):
     permission_classes = [permissions.AllowAny]
-    throttle_classes = [ScopedRateThrottle]
+    throttle_classes = [ScopedSlidingWindowThrottle]
     throttle_scope = "v1_orders"
     serializer_class = CreateOrderSerializer
 
     def post(self, request):
+        key, body_hash, ttl = idempotency.resolve_key(request, scope="orders")
+
+        record = idempotency.find(key, body_hash)
+        if record is not None:
+            return self._replay(record)
+
         s = CreateOrderSerializer(data=request.data, context={"request": request})
         s.is_valid(raise_exception=True)
-        order = s.save()
+
+        data = None
+        try:
+            with transaction.atomic():
+                order = s.save()
+                data = {
+                    "orderId": str(order.uuid),
+                    "orderNumber": order.order_number,
+                    "message": "Заявка успешно отправлена! Мы свяжемся с вами в ближайшее время.",
+                }
+                idempotency.store(key, body_hash, ttl, status.HTTP_201_CREATED, data, order=order)
+        except IntegrityError:
+            # параллельный повтор с тем же ключом успел первым — отдаём его ответ
+            record = idempotency.find(key, body_hash) if data is not None else None
+            if record is None:
+                raise
+            return self._replay(record)
 
         logger.info(
             "New order: %s phone=%s total=%s items=%s",
             order.order_number,
             order.phone,
             str(order.total),
-            order.items.count(),
+            len(s.validated_data["items"]),
         )
+        metrics.inc("orders_created_total")
+
+        return ok(data, http_status=status.HTTP_201_CREATED, cache_seconds=None)
 
-        return ok(
-            {
-                "orderId": str(order.uuid),
-                "orderNumber": order.order_number,
-                "message": "Заявка успешно отправлена! Мы свяжемся с вами в ближайшее время.",
-            },
-            http_status=status.HTTP_201_CREATED,
-            cache_seconds=None,
-        )
\ No newline at end of file
+    def _replay(self, record):
+        resp = ok(record.response_data, http_status=record.response_status, cache_seconds=None)
+        resp["Idempotent-Replayed"] = "true"
+        return resp
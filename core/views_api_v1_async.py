@@ -0,0 +1,173 @@
+# core/views_api_v1_async.py
+"""
+Async-варианты публичных эндпоинтов каталога (GET /api/v1/merch*) для ASGI.
+
+Ответы, кэш, ETag и троттлинг — те же, что у views_api_v1 (общие хелперы оттуда),
+но запросы к БД идут через async ORM. Сами запросы одного ответа выполняются
+по очереди (async ORM гонит их через sync_to_async(thread_sensitive=True) в одном
+потоке), выигрыш в другом: пока запрос ждёт БД или кэш, event loop обслуживает
+другие запросы.
+
+DRF не умеет async-view, поэтому это обычные django.views.View;
+ошибки приводятся к формату ТЗ тем же custom_exception_handler.
+Подключаются в core/urls.py при ASYNC_CATALOG_VIEWS = True.
+"""
+from __future__ import annotations
+
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.views import View
+from rest_framework.exceptions import Throttled
+
+from . import catalog_cache
+from .exception_handler import custom_exception_handler
+from .exceptions import ApiError
+from .fragments import dumps, fragments_for, with_host
+from .models import MerchCategory, Product
+from .serializers import MerchCategorySerializer
+from .throttling import ScopedSlidingWindowThrottle
+from .views_api_v1 import (
+    batch_body,
+    batch_ids,
+    catalog_headers,
+    cursor_pagination,
+    cursor_queryset,
+    list_body,
+    list_cache_key,
+    list_params,
+    merch_queryset,
+    nonempty_categories_qs,
+    offset_ordered,
+    offset_pagination,
+)
+
+
+def error_response(exc: Exception) -> HttpResponse:
+    resp = custom_exception_handler(exc, {})
+    out = HttpResponse(dumps(resp.data), status=resp.status_code, content_type="application/json")
+    if isinstance(exc, Throttled) and exc.wait is not None:
+        out["Retry-After"] = str(int(exc.wait))
+    return out
+
+
+async def fragments(products: list[Product]) -> list[str]:
+    # фрагменты без api_fragment (старые данные) рендерит синхронный сериализатор
+    if any(not p.api_fragment for p in products):
+        return await sync_to_async(fragments_for)(products)
+    return [p.api_fragment for p in products]
+
+
+class AsyncCatalogView(View):
+    throttle_scope = "v1_merch"
+    cache_seconds = 60
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            await self.check_throttle(request)
+            return await super().dispatch(request, *args, **kwargs)
+        except Exception as exc:
+            return error_response(exc)
+
+    async def check_throttle(self, request):
+        request.user = await request.auser()
+        throttle = ScopedSlidingWindowThrottle()
+        # счётчики в SQLite-файле / Redis — не блокируем event loop
+        if not await sync_to_async(throttle.allow_request, thread_sensitive=False)(request, self):
+            raise Throttled(wait=throttle.wait())
+
+    async def catalog_ok(self, request, kind: str, build, **params):
+        """Async-аналог views_api_v1.catalog_ok."""
+        key, last_modified = await sync_to_async(self._key_and_last_modified)(request, kind, params)
+        etag = catalog_cache.etag_for(key)
+
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return catalog_headers(not_modified, etag, last_modified, self.cache_seconds)
+
+        data = await catalog_cache.aget_or_build(key, build)
+        if data is None:
+            raise ApiError(code="NOT_FOUND", message="Ресурс не найден", status_code=404)
+
+        resp = HttpResponse('{"success":true,"data":%s}' % data, content_type="application/json")
+        return catalog_headers(resp, etag, last_modified, self.cache_seconds)
+
+    @staticmethod
+    def _key_and_last_modified(request, kind, params):
+        if kind == "list":
+            key = list_cache_key(request, params)
+        else:
+            key = catalog_cache.cache_key(kind, request, **params)
+        return key, catalog_cache.get_last_modified(request)
+
+
+class AsyncMerchListView(AsyncCatalogView):
+    async def get(self, request):
+        if "ids" in request.GET:
+            ids = batch_ids(request.GET)
+            return await self.catalog_ok(
+                request, "batch", lambda: self._build_batch(request, ids), ids=[i.hex for i in ids]
+            )
+
+        params = list_params(request.GET)
+        return await self.catalog_ok(request, "list", lambda: self._build(request, **params), **params)
+
+    async def _build(self, request, category, search, in_stock, page: int, limit: int, cursor: str | None):
+        if search:
+            # search_products может один раз проверить наличие FTS-таблицы
+            qs = await sync_to_async(merch_queryset)(category, search, in_stock)
+        else:
+            qs = merch_queryset(category, search, in_stock)
+
+        if cursor is not None:
+            items, pagination = await self._cursor_page(qs, cursor, limit)
+        else:
+            items, pagination = await self._offset_page(qs, page, limit)
+        return list_body(request, await fragments(items), pagination, await self._categories())
+
+    async def _offset_page(self, qs, page: int, limit: int):
+        qs = offset_ordered(qs)
+        offset, pagination = offset_pagination(await qs.acount(), page, limit)
+        return await self._slice(qs, offset, limit), pagination
+
+    async def _cursor_page(self, qs, cursor: str, limit: int):
+        qs, direction = cursor_queryset(qs, cursor)
+        return cursor_pagination(await self._slice(qs, 0, limit + 1), cursor, direction, limit)
+
+    @staticmethod
+    async def _slice(qs, offset: int, limit: int) -> list[Product]:
+        return [p async for p in qs[offset : offset + limit]]
+
+    @staticmethod
+    async def _categories() -> list[str]:
+        return [name async for name in nonempty_categories_qs()]
+
+    async def _build_batch(self, request, ids: list[uuid.UUID]):
+        products = [p async for p in Product.objects.only("id", "uuid", "api_fragment").filter(uuid__in=ids)]
+        if any(not p.api_fragment for p in products):
+            return await sync_to_async(batch_body)(request, ids, products)
+        return batch_body(request, ids, products)
+
+
+class AsyncMerchDetailView(AsyncCatalogView):
+    async def get(self, request, id):
+        return await self.catalog_ok(request, "detail", lambda: self._build(request, id), id=id)
+
+    async def _build(self, request, id):
+        product = await Product.objects.only("id", "api_fragment").filter(uuid=id).afirst()
+        if not product:
+            return None
+        return with_host((await fragments([product]))[0], request)
+
+
+class AsyncMerchCategoriesView(AsyncCatalogView):
+    cache_seconds = 300
+
+    async def get(self, request):
+        return await self.catalog_ok(request, "categories", self._build)
+
+    async def _build(self):
+        categories = [c async for c in MerchCategory.objects.order_by("name")]
+        return dumps(MerchCategorySerializer(categories, many=True).data)
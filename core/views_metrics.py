@@ -0,0 +1,27 @@
+# core/views_metrics.py
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from rest_framework import permissions
+from rest_framework.views import APIView
+
+from . import metrics
+
+
+class CanScrapeMetrics(permissions.BasePermission):
+    """METRICS_TOKEN задан — нужен заголовок Authorization: Bearer <token>; иначе только staff."""
+
+    def has_permission(self, request, view):
+        token = getattr(settings, "METRICS_TOKEN", "")
+        if token:
+            return constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {token}")
+        return bool(request.user and request.user.is_staff)
+
+
+class MetricsAPIView(APIView):
+    """GET /api/metrics — текстовый формат Prometheus (core/metrics.py)."""
+    permission_classes = [CanScrapeMetrics]
+    throttle_classes = []
+
+    def get(self, request):
+        return HttpResponse(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
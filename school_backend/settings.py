@@ -10,22 +10,32 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+import sys
 from pathlib import Path
 
+from .database import database_from_env, env_bool, replicas_from_env
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+TESTING = 'test' in sys.argv[1:2]
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-g3@kb@d98g^cw)5$=fh#=u8zopurw4rt&!v$#itg%scx61fevn'
+SECRET_KEY = os.environ.get(
+    'DJANGO_SECRET_KEY',
+    'django-insecure-g3@kb@d98g^cw)5$=fh#=u8zopurw4rt&!v$#itg%scx61fevn',
+)
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# по умолчанию выключен: деплой без переменной не должен оказаться в debug; локально — DJANGO_DEBUG=1
+DEBUG = env_bool('DJANGO_DEBUG', False)
 
-ALLOWED_HOSTS = ['*']
+ALLOWED_HOSTS = os.environ.get('DJANGO_ALLOWED_HOSTS', '*').split(',')
 
 
 # Application definition
@@ -50,7 +60,10 @@ MIDDLEWARE = [
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
+    'core.middleware.replica_routing_middleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.perf_middleware',
+    'core.middleware.nplusone_middleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -77,12 +90,36 @@ WSGI_APPLICATION = 'school_backend.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
+# DATABASE_URL (postgres://... / sqlite:///...), DB_CONN_MAX_AGE, DB_POOL, DB_PGBOUNCER —
+# см. school_backend/database.py. Без DATABASE_URL — локальный db.sqlite3.
+
+SQLITE_OPTIONS = {
+    # BEGIN IMMEDIATE: писатель берёт блокировку сразу, а не на первом INSERT,
+    # иначе параллельные заказы ловят «database is locked» посреди транзакции
+    'transaction_mode': os.environ.get('SQLITE_TRANSACTION_MODE', 'IMMEDIATE'),
+}
 
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': database_from_env(BASE_DIR, sqlite_options=SQLITE_OPTIONS),
+    **replicas_from_env(sqlite_options=SQLITE_OPTIONS),
+}
+
+# Реплики для чтения (DATABASE_REPLICA_URLS): безопасные запросы к /api/ читают с них.
+# В тестах реплика — зеркало default (TEST.MIRROR), а данные TestCase не закоммичены и через
+# второе соединение не видны, поэтому роутер включают только тесты реплик (override_settings)
+DATABASE_REPLICA_ALIASES = [alias for alias in DATABASES if alias != 'default']
+DATABASE_REPLICAS = [] if TESTING else DATABASE_REPLICA_ALIASES
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+REPLICA_READ_PATH_PREFIXES = ['/api/']
+
+# PRAGMA для каждого нового SQLite-соединения (core/db.py); переопределяются через окружение
+SQLITE_PRAGMAS = {
+    'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 128 * 1024 * 1024)),
+    'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -32000)),  # отрицательное = KiB
+    'temp_store': os.environ.get('SQLITE_TEMP_STORE', 'MEMORY'),
 }
 
 REST_FRAMEWORK = {
@@ -92,17 +129,97 @@ REST_FRAMEWORK = {
     ],
     "EXCEPTION_HANDLER": "core.exception_handler.custom_exception_handler",
     'DEFAULT_THROTTLE_CLASSES': [
-        'rest_framework.throttling.ScopedRateThrottle',
-        'rest_framework.throttling.AnonRateThrottle',
+        'core.throttling.ScopedSlidingWindowThrottle',
+        'core.throttling.AnonSlidingWindowThrottle',
     ],
     "DEFAULT_THROTTLE_RATES": {
         "anon": "60/min", 
         "reviews": "10/day",
         "v1_merch": "120/min",
+        "v1_cart": "60/min",
         "v1_orders": "20/hour",
     },
 }
 
+# Счётчики троттлинга должны быть общими для всех процессов (иначе N воркеров = N× лимит):
+# THROTTLE_CACHE_URL=redis://host:6379/1 (нужен пакет redis), без него — SQLite-файл THROTTLE_DB_PATH
+THROTTLE_CACHE_URL = os.environ.get('THROTTLE_CACHE_URL', '')
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+if THROTTLE_CACHE_URL:
+    CACHES['throttle'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': THROTTLE_CACHE_URL,
+    }
+THROTTLE_CACHE_ALIAS = 'throttle' if THROTTLE_CACHE_URL else None
+THROTTLE_DB_PATH = os.environ.get(
+    'THROTTLE_DB_PATH', str(BASE_DIR / 'var' / ('throttle-test.sqlite3' if TESTING else 'throttle.sqlite3'))
+)
+
+# Async-варианты GET /api/v1/merch* (core/views_api_v1_async.py) — включайте под ASGI-сервером
+ASYNC_CATALOG_VIEWS = env_bool('DJANGO_ASYNC_CATALOG', False)
+
+# Кэш ответов публичного каталога (/api/v1/merch*). Версия каталога хранится в БД (CatalogVersion),
+# так что инвалидация сразу видна всем воркерам; общий бэкенд здесь лишь экономит пересборки.
+MERCH_CACHE_ALIAS = "default"
+MERCH_CACHE_TIMEOUT = 300
+
+# Идемпотентность POST /api/v1/orders (секунды): по заголовку Idempotency-Key и по телу запроса
+ORDER_IDEMPOTENCY_TTL = 24 * 3600
+ORDER_IDEMPOTENCY_BODY_TTL = 120
+
+# Уведомления о новых заказах (доставляет воркер, см. core/notifications.py). Пример:
+# ORDER_NOTIFICATION_SINKS = [
+#     {"NAME": "email", "BACKEND": "core.notifications.EmailSink", "OPTIONS": {"recipients": ["shop@school.kz"]}},
+#     {"NAME": "telegram", "BACKEND": "core.notifications.TelegramSink", "OPTIONS": {"token": "...", "chat_id": "..."}},
+#     {"NAME": "hook", "BACKEND": "core.notifications.WebhookSink", "OPTIONS": {"url": "https://..."}},
+# ]
+ORDER_NOTIFICATION_SINKS = []
+ORDER_NOTIFICATION_MAX_ATTEMPTS = 8
+
+# Скачивание документов (core/downloads.py): по умолчанию файл отдаёт Django;
+# за nginx — DOCUMENT_DOWNLOAD_BACKEND=core.downloads.XAccelRedirectBackend (internal location
+# DOCUMENT_DOWNLOAD_LOCATION с alias на MEDIA_ROOT), за Apache — core.downloads.XSendfileBackend
+DOCUMENT_DOWNLOAD = {
+    'BACKEND': os.environ.get('DOCUMENT_DOWNLOAD_BACKEND', 'core.downloads.FileResponseBackend'),
+    'OPTIONS': {'location': os.environ.get('DOCUMENT_DOWNLOAD_LOCATION', '/protected-media/')},
+}
+
+# /api/metrics (core/metrics.py): общее для всех процессов хранилище и токен для Prometheus
+METRICS_DB_PATH = os.environ.get(
+    'METRICS_DB_PATH', str(BASE_DIR / 'var' / ('metrics-test.sqlite3' if TESTING else 'metrics.sqlite3'))
+)
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Детектор N+1 для разработки (core/nplusone.py): один и тот же SQL из одного места кода
+# больше NPLUSONE_THRESHOLD раз за запрос -> исключение (NPLUSONE_RAISE, по умолчанию DEBUG) или warning
+NPLUSONE_DETECTION = env_bool('DJANGO_NPLUSONE', False)
+NPLUSONE_THRESHOLD = int(os.environ.get('NPLUSONE_THRESHOLD', 5))
+NPLUSONE_RAISE = env_bool('NPLUSONE_RAISE', DEBUG)
+
+# Заголовок Server-Timing (число SQL, время БД) видят только staff; 1 — всем клиентам (локальное профилирование)
+SERVER_TIMING_PUBLIC = env_bool('PERF_SERVER_TIMING_PUBLIC', False)
+
+# Строка метрик на каждый запрос (core.middleware.perf_middleware); PERF_LOG_LEVEL=WARNING — выключить
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.perf': {
+            'handlers': ['console'],
+            # в `manage.py test` строки на каждый запрос только мешают
+            'level': os.environ.get('PERF_LOG_LEVEL', 'WARNING' if TESTING else 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
 SPECTACULAR_SETTINGS = {
     'TITLE': 'School Site API',
     'DESCRIPTION': 'Учителя, отзывы, контакты школы, документы (загрузка/скачивание).',